@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+u"""
+    Benchmark of the documentation builds of synthetic workspaces.
+
+    The package discovery, the read of the directives, the resolve of the
+    cross references and the write are timed separately, and the results
+    are stored in a JSON file to be compared between the releases.
+
+    Usage::
+
+       $ python benchmarks/bench_build.py --packages 10 1000 10000 \\
+             --output results.json
+"""
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import sphinx  # noqa
+from sphinx.application import Sphinx  # noqa
+from sphinxcontrib.ros import ROSDomain  # noqa
+from sphinxcontrib.ros.index import ROSPackageIndex  # noqa
+
+from workspace import make_workspace  # noqa
+
+PHASES = ('discovery', 'read', 'resolve', 'write')
+
+
+class Timer(object):
+    u"""Timer of the build phases using the Sphinx events
+    """
+    def __init__(self):
+        self.marks = {}
+        self.resolve = 0.0
+
+    def mark(self, name):
+        self.marks[name] = time.time()
+
+    def connect(self, app):
+        app.connect('env-before-read-docs',
+                    lambda app, env, docnames: self.mark('read'))
+        app.connect('env-updated', lambda app, env: self.mark('write'))
+        app.connect('build-finished',
+                    lambda app, exception: self.mark('finished'))
+
+    def wrap(self, func):
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.resolve += time.time() - start
+        return wrapper
+
+    def result(self):
+        write = self.marks['finished'] - self.marks['write']
+        return {'read': self.marks['write'] - self.marks['read'],
+                'resolve': self.resolve,
+                'write': write - self.resolve}
+
+
+def get_version():
+    try:
+        import pkg_resources
+        return pkg_resources.require('sphinxcontrib-ros')[0].version
+    except Exception:
+        return '0.0.0'
+
+
+def measure_discovery(doc_path):
+    start = time.time()
+    package_index = ROSPackageIndex()
+    package_index.update([os.path.join(doc_path, '..', 'src')])
+    return time.time() - start, len(package_index.packages)
+
+
+def measure_build(doc_path, builder):
+    timer = Timer()
+    resolve_xref = ROSDomain.resolve_xref
+    resolve_any_xref = ROSDomain.resolve_any_xref
+    ROSDomain.resolve_xref = timer.wrap(resolve_xref)
+    ROSDomain.resolve_any_xref = timer.wrap(resolve_any_xref)
+    try:
+        app = Sphinx(doc_path, doc_path, os.path.join(doc_path, '_build'),
+                     os.path.join(doc_path, '_build', '.doctrees'),
+                     builder, status=None, warning=io.StringIO(),
+                     freshenv=True)
+        timer.connect(app)
+        app.build()
+    finally:
+        ROSDomain.resolve_xref = resolve_xref
+        ROSDomain.resolve_any_xref = resolve_any_xref
+    result = timer.result()
+    result['objects'] = len(app.env.get_domain('ros').data['objects'])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--packages', type=int, nargs='+',
+                        default=[10, 1000, 10000])
+    parser.add_argument('--builder', default='html')
+    parser.add_argument('--output', help='JSON file to store the results')
+    parser.add_argument('--baseline',
+                        help='JSON file of the results to compare with')
+    args = parser.parse_args()
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = dict((result['packages'], result)
+                            for result in json.load(f)['results'])
+    results = []
+    print('{0:>8} {1:>8} '.format('packages', 'objects') +
+          ' '.join('{0:>10}'.format(phase) for phase in PHASES))
+    for packages in args.packages:
+        tmpdir = tempfile.mkdtemp()
+        try:
+            doc_path = make_workspace(tmpdir, packages)
+            discovery, found = measure_discovery(doc_path)
+            assert found == packages
+            result = measure_build(doc_path, args.builder)
+        finally:
+            shutil.rmtree(tmpdir)
+        result.update({'packages': packages, 'discovery': discovery})
+        results.append(result)
+        print('{0:>8} {1:>8} '.format(packages, result['objects']) +
+              ' '.join('{0:>10.3f}'.format(result[phase])
+                       for phase in PHASES))
+        if packages in baseline:
+            print('{0:>17} '.format('vs baseline') +
+                  ' '.join('{0:>+9.0%}'.format(
+                      result[phase] / baseline[packages][phase] - 1)
+                      for phase in PHASES))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'version': get_version(),
+                       'sphinx': sphinx.__version__,
+                       'python': platform.python_version(),
+                       'builder': args.builder,
+                       'results': results}, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
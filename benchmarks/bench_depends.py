@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+u"""
+    Benchmark of the transitive dependencies of all the packages of a
+    workspace, memoized over the graph or found by a BFS per package.
+
+    The packages are layered, each depending on a few packages of the
+    lower layers.
+
+    Usage::
+
+       $ python benchmarks/bench_depends.py --packages 1400
+"""
+from __future__ import print_function
+
+import argparse
+import collections
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sphinxcontrib.ros.dependgraph import ROSDependGraph  # noqa
+
+Package = collections.namedtuple('Package', 'build_depends exec_depends')
+Depend = collections.namedtuple('Depend', 'name')
+
+
+def make_packages(count, depends, layers):
+    u"""Make the packages as a dict of name -> package
+    """
+    rand = random.Random(0)
+    names = ['package_{0}'.format(i) for i in range(count)]
+    per_layer = max(1, count // layers)
+    packages = {}
+    for i, name in enumerate(names):
+        lower = names[:i // per_layer * per_layer]
+        packages[name] = Package(
+            [Depend(depend) for depend in
+             rand.sample(lower, min(depends, len(lower)))], [])
+    return packages
+
+
+def closures_by_bfs(packages, kinds):
+    closures = {}
+    for name in packages:
+        found = set()
+        queue = collections.deque([name])
+        while queue:
+            package = packages.get(queue.popleft())
+            for depend in package.build_depends if package else ():
+                if depend.name not in found:
+                    found.add(depend.name)
+                    queue.append(depend.name)
+        closures[name] = found
+    return closures
+
+
+def closures_by_graph(packages, kinds):
+    depend_graph = ROSDependGraph(packages.get)
+    return dict((name, depend_graph.get_closure(name, kinds))
+                for name in packages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--packages', type=int, nargs='+',
+                        default=[100, 400, 1400])
+    parser.add_argument('--depends', type=int, default=5)
+    parser.add_argument('--layers', type=int, default=20)
+    args = parser.parse_args()
+    kinds = ('build',)
+    print('{0:>8} {1:>10} {2:>10}'.format('packages', 'bfs', 'graph'))
+    for count in args.packages:
+        packages = make_packages(count, args.depends, args.layers)
+        start = time.time()
+        bfs = closures_by_bfs(packages, kinds)
+        middle = time.time()
+        graph = closures_by_graph(packages, kinds)
+        end = time.time()
+        assert bfs == graph
+        print('{0:>8} {1:>10.4f} {2:>10.4f}'.format(
+            count, middle - start, end - middle))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+u"""
+    Benchmark of the package discovery over many base paths.
+
+    Usage::
+
+       $ python benchmarks/bench_discovery.py --roots 6 --packages 200
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sphinxcontrib.ros.index import ROSPackageIndex  # noqa
+
+MANIFEST = u"""<?xml version="1.0"?>
+<package>
+  <name>{name}</name>
+  <version>0.0.0</version>
+  <description>The {name} package</description>
+  <maintainer email="john@mail.com">John Smith</maintainer>
+  <license>BSD</license>
+  <buildtool_depend>catkin</buildtool_depend>
+</package>
+"""
+
+
+def make_roots(tmpdir, roots, packages, groups=10):
+    u"""Make base paths which have packages in nested directories
+    """
+    base_paths = []
+    for root in range(roots):
+        base_path = os.path.join(tmpdir, 'ws_{0}'.format(root), 'src')
+        for package in range(packages):
+            package_path = os.path.join(base_path,
+                                        'group_{0}'.format(package % groups),
+                                        'pkg_{0}_{1}'.format(root, package))
+            os.makedirs(os.path.join(package_path, 'msg'))
+            with open(os.path.join(package_path, 'package.xml'), 'w') as f:
+                f.write(MANIFEST.format(name=os.path.basename(package_path)))
+        base_paths.append(base_path)
+    return base_paths
+
+
+def measure(base_paths, workers, package_index=None):
+    if package_index is None:
+        package_index = ROSPackageIndex()
+    start = time.time()
+    package_index.update(base_paths, workers)
+    return time.time() - start, package_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--roots', type=int, default=6)
+    parser.add_argument('--packages', type=int, default=200,
+                        help='number of packages per root')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        base_paths = make_roots(tmpdir, args.roots, args.packages)
+        print('{0} roots x {1} packages'.format(args.roots, args.packages))
+        print('{0:>8} {1:>10} {2:>10}'.format('workers', 'cold [s]',
+                                              'warm [s]'))
+        for workers in args.workers:
+            cold, package_index = measure(base_paths, workers)
+            warm, _ = measure(base_paths, workers, package_index)
+            assert len(package_index.packages) == args.roots * args.packages
+            print('{0:>8} {1:>10.3f} {2:>10.3f}'.format(workers, cold, warm))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+u"""
+    Benchmark of clear_doc and merge_domaindata of the ROS domain.
+
+    Usage::
+
+       $ python benchmarks/bench_domain.py --objects 50000 --docs 1000
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sphinxcontrib.ros import ROSDomain  # noqa
+
+
+class DummyEnv(object):
+    def __init__(self):
+        self.domaindata = {}
+
+
+def make_domain(objects, docs):
+    domain = ROSDomain(DummyEnv())
+    for i in range(objects):
+        domain.note_object('message', 'pkg_{0}/Type{1}'.format(i % docs, i),
+                           'doc_{0}'.format(i % docs))
+    return domain
+
+
+def clear_doc_by_scan(domain, docname):
+    u"""clear_doc without the docname index, for comparison
+    """
+    for fullname, fn in list(domain.data['objects'].items()):
+        if fn == docname:
+            del domain.data['objects'][fullname]
+
+
+def measure(func, domain, docnames):
+    start = time.time()
+    for docname in docnames:
+        func(domain, docname)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--objects', type=int, default=50000)
+    parser.add_argument('--docs', type=int, default=1000)
+    parser.add_argument('--changed', type=int, default=300,
+                        help='number of documents to clear and merge')
+    args = parser.parse_args()
+    docnames = ['doc_{0}'.format(i) for i in range(args.changed)]
+    print('{0} objects in {1} documents, {2} changed'.format(
+        args.objects, args.docs, args.changed))
+
+    scan = measure(clear_doc_by_scan,
+                   make_domain(args.objects, args.docs), docnames)
+    print('{0:<24} {1:>8.3f} s'.format('clear_doc (scan)', scan))
+    indexed = measure(ROSDomain.clear_doc,
+                      make_domain(args.objects, args.docs), docnames)
+    print('{0:<24} {1:>8.3f} s'.format('clear_doc (indexed)', indexed))
+
+    domain = make_domain(args.objects, args.docs)
+    other = make_domain(args.objects, args.docs)
+    start = time.time()
+    domain.merge_domaindata(docnames, other.data)
+    print('{0:<24} {1:>8.3f} s'.format('merge_domaindata',
+                                       time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+u"""
+    Benchmark of the memory used by the parsed message files.
+
+    The compact field groups, with the comments kept as ranges, are
+    measured against the field objects holding their own StringLists, as
+    they were parsed before.
+
+    Usage::
+
+       $ python benchmarks/bench_memory.py --files 1000 --fields 300
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from docutils.statemachine import StringList  # noqa
+from bench_parse import make_message  # noqa
+from sphinxcontrib.ros.message import (ROSMessageBase, BUILTIN_TYPES,  # noqa
+                                       FIELD, COMMENT, SEPARATOR, tokenize)
+
+
+class EagerField(object):
+    u"""ROSField as it was before, for comparison
+    """
+    def __init__(self, match, source=None, offset=0,
+                 pre_comments='', package_name=''):
+        self.source = source
+        self.offset = offset
+        self.name = match.group('name')
+        self.type = match.group('type')
+        size = match.group('size')
+        self.size = size.replace(' ', '') if size else ''
+        value = match.group('value')
+        comment = match.group('field_comment')
+        # trailing spaces are matched by the last group
+        if comment:
+            comment = comment.rstrip()
+        elif value:
+            value = value.rstrip()
+        self.value = value.lstrip()[1:] if value else ''
+        comment = comment or ''
+        if self.type == 'string' and self.value:
+            self.value += match.group('space') + comment
+            comment = ''
+        else:
+            self.value = self.value.strip()
+            comment = comment[1:]
+        if self.type not in BUILTIN_TYPES:
+            if '/' not in self.type:
+                self.type = package_name + '/' + self.type
+        elif self.type == 'Header':
+            self.type = 'std_msgs/Header'
+        self.comment = StringList([comment], items=[(source, offset)])
+        self.pre_comments = pre_comments
+        self.post_comments = StringList()
+
+
+class EagerFieldGroup(object):
+    u"""ROSFieldGroup as it was before, for comparison
+    """
+    def __init__(self, package_name):
+        self.package_name = package_name
+        self.description = StringList()
+        self.fields = []
+
+    def append_comment(self, line, source, offset):
+        if self.fields:
+            self.fields[-1].post_comments.append(line,
+                                                 source=source,
+                                                 offset=offset)
+        else:
+            self.description.append(line, source=source, offset=offset)
+
+    def append_field(self, match, source, offset):
+        if self.fields:
+            pre_comments = self.fields[-1].post_comments
+        else:
+            pre_comments = self.description
+        self.fields.append(EagerField(match, source=source, offset=offset,
+                                      pre_comments=pre_comments,
+                                      package_name=self.package_name))
+
+
+def parse_eager(file_content, package_name):
+    u"""ROSTypeFile.parse as it was before, for comparison
+    """
+    field_groups = []
+    field_group = EagerFieldGroup(package_name)
+    for kind, source, offset, match in tokenize(file_content):
+        if kind == FIELD:
+            field_group.append_field(match, source, offset)
+        elif kind == COMMENT:
+            field_group.append_comment(
+                (match.group('comment') or u'').rstrip(), source, offset)
+        elif kind == SEPARATOR:
+            field_groups.append(field_group)
+            field_group = EagerFieldGroup(package_name)
+    field_groups.append(field_group)
+    return field_groups
+
+
+def measure(contents, parse):
+    tracemalloc.start()
+    parsed = [parse(content, 'pkg') for content in contents]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del parsed
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--fields', type=int, default=300)
+    parser.add_argument('--constants', type=int, default=100)
+    args = parser.parse_args()
+    contents = [make_message(i, args.fields, args.constants)
+                for i in range(args.files)]
+    print('{0} message files with {1} fields and {2} constants'.format(
+        args.files, args.fields, args.constants))
+    for label, parse in (('compact', ROSMessageBase.type_file.parse),
+                         ('eager', parse_eager)):
+        current, peak = measure(contents, parse)
+        print('{0:<8} {1:>10.1f} MiB (peak {2:.1f} MiB)'.format(
+            label, current / 1048576.0, peak / 1048576.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+u"""
+    Benchmark of merge_fields on a message with many constants.
+
+    The values of the constants are merged into the constants, as for
+    enum-style messages.
+
+    Usage::
+
+       $ python benchmarks/bench_merge.py --constants 1000
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from docutils import nodes  # noqa
+from sphinx import addnodes  # noqa
+from sphinxcontrib.ros.base import MAKE_FIELD_ENV  # noqa
+from sphinxcontrib.ros.message import ROSAutoMessage  # noqa
+try:
+    unicode
+except NameError:
+    unicode = str
+
+
+def make_field(field_type, types, items):
+    if MAKE_FIELD_ENV:
+        return field_type.make_field(types, 'ros', items, env=None)
+    return field_type.make_field(types, 'ros', items)
+
+
+def make_node(constants):
+    u"""Make the desc node of a message with the constants
+    """
+    field_types = dict((field_type.name, field_type)
+                       for field_type in ROSAutoMessage.doc_field_types)
+    names = ['CONSTANT_{0}'.format(i) for i in range(constants)]
+    field_list = nodes.field_list()
+    field_list += make_field(
+        field_types['constant'],
+        {'constant': dict((name, [nodes.Text(u'int32')]) for name in names)},
+        [(name, [nodes.Text(u'description')]) for name in names])
+    field_list += make_field(
+        field_types['constant-value'], {},
+        [(name, [nodes.Text(unicode(i))]) for i, name in enumerate(names)])
+    desc = addnodes.desc()
+    desc += addnodes.desc_signature()
+    desc += addnodes.desc_content('', field_list)
+    return [addnodes.index(), desc]
+
+
+def merge_fields_by_scan(self, node):
+    u"""merge_fields comparing all the items, for comparison
+    """
+    contentnode = node[1][-1]
+    labelmap = {field_type.name: unicode(field_type.label)
+                for field_type in self.doc_field_types}
+    field_nodes = {}
+    for child in contentnode:
+        if isinstance(child, nodes.field_list):
+            for field in child:
+                if isinstance(field, nodes.field):
+                    field_nodes[field[0].astext()] = field
+    for field_src, field_dest in self.doc_merge_fields.items():
+        label_src = labelmap[field_src]
+        if label_src in field_nodes:
+            field_node_src = field_nodes[label_src]
+            label_dest = labelmap[field_dest]
+            if label_dest in field_nodes:
+                field_node_dest = field_nodes[label_dest]
+                for item_src in field_node_src[1][0]:
+                    name = item_src[0][0].astext()
+                    for item_dest in field_node_dest[1][0]:
+                        if name == item_dest[0][0].astext():
+                            self.merge_field(item_src[0], item_dest[0])
+            for child in contentnode:
+                if isinstance(child, nodes.field_list):
+                    child.remove(field_node_src)
+
+
+def measure(func, constants, repeat):
+    directive = ROSAutoMessage.__new__(ROSAutoMessage)
+    elapsed = []
+    for _ in range(repeat):
+        node = make_node(constants)
+        start = time.time()
+        func(directive, node)
+        elapsed.append(time.time() - start)
+    return min(elapsed), node
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--constants', type=int, nargs='+',
+                        default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print('{0:>9} {1:>10} {2:>10}'.format('constants', 'scan', 'index'))
+    for constants in args.constants:
+        scan, scan_node = measure(merge_fields_by_scan, constants,
+                                  args.repeat)
+        index, index_node = measure(ROSAutoMessage.merge_fields, constants,
+                                    args.repeat)
+        assert scan_node[1].pformat() == index_node[1].pformat()
+        print('{0:>9} {1:>10.4f} {2:>10.4f}'.format(constants, scan, index))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+u"""
+    Benchmark of the message file parser and of making the fields.
+
+    Usage::
+
+       $ python benchmarks/bench_parse.py --files 10000
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from docutils.statemachine import StringList  # noqa
+from sphinxcontrib.ros.message import ROSMessageBase, tokenize  # noqa
+
+# the per-line regular expression used before the tokenizer
+MATCHER = re.compile(r'([\w/]+)(\s*\[\s*\d*\s*\])?'
+                     r'\s+(\w+)(\s*=\s*[^#]+)?(\s*)(#.*)?$')
+
+
+def make_message(index, fields=20, constants=10):
+    lines = ['# Message {0}'.format(index),
+             '#  generated for the benchmark', '']
+    for i in range(constants):
+        lines.append('uint8 CONSTANT_{0}={0}  # constant {0}'.format(i))
+    lines.append('')
+    for i in range(fields):
+        lines.append('# comment of field_{0}'.format(i))
+        if i % 3 == 0:
+            lines.append('float64[] field_{0}  # array'.format(i))
+        elif i % 3 == 1:
+            lines.append('geometry_msgs/Pose field_{0}'.format(i))
+        else:
+            lines.append('Header field_{0}  # header'.format(i))
+            lines.append('#  continued comment')
+    return StringList(lines, source='Message{0}.msg'.format(index))
+
+
+def legacy_scan(file_content):
+    u"""Per-line scan done before the tokenizer, for comparison
+    """
+    for item in file_content.xitems():
+        line = item[2].strip()
+        if line and not [c for c in line if not c == '-']:
+            continue
+        if line == '' or line[0] == '#':
+            continue
+        MATCHER.match(line)
+
+
+def single_scan(file_content):
+    for token in tokenize(file_content):
+        pass
+
+
+def measure(func, contents):
+    start = time.time()
+    for content in contents:
+        func(content)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=10000)
+    args = parser.parse_args()
+    contents = [make_message(i) for i in range(args.files)]
+    type_file = ROSMessageBase.type_file
+    print('{0} message files'.format(args.files))
+    for label, func in (('scan (per-line)', legacy_scan),
+                        ('scan (tokenizer)', single_scan),
+                        ('parse', lambda c: type_file.parse(c, 'pkg'))):
+        print('{0:<20} {1:>8.3f} s'.format(label, measure(func, contents)))
+    parsed = [type_file.parse(content, 'pkg') for content in contents]
+    for option in ('up', 'up-all', 'right1', 'right-down', 'right-down-all',
+                   'right-down-all quote'):
+        option = option.split()
+        elapsed = measure(
+            lambda g: type_file.make_docfields(g, option), parsed)
+        print('{0:<20} {1:>8.3f} s'.format(' '.join(option), elapsed))
+
+
+if __name__ == '__main__':
+    main()
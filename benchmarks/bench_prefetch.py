@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+u"""
+    Benchmark of the read phase with the type files prefetched by a thread
+    pool or read by the directives.
+
+    The latency of a networked filesystem is emulated by sleeping before
+    each read of a type file.
+
+    Usage::
+
+       $ python benchmarks/bench_prefetch.py --packages 100 --latency 0.005
+"""
+from __future__ import print_function
+
+import argparse
+import codecs
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sphinx.application import Sphinx  # noqa
+
+import sphinxcontrib.ros.message  # noqa
+from workspace import make_workspace  # noqa
+
+
+class SlowCodecs(object):
+    u"""codecs of which open waits for the latency
+    """
+    def __init__(self, latency):
+        self.latency = latency
+
+    def open(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return codecs.open(*args, **kwargs)
+
+
+def measure_read(doc_path, prefetch, workers):
+    u"""Measure the read phase of a fresh build, writing nothing
+    """
+    marks = {}
+    app = Sphinx(doc_path, doc_path, os.path.join(doc_path, '_build'),
+                 os.path.join(doc_path, '_build', '.doctrees'),
+                 'dummy', status=None, warning=io.StringIO(), freshenv=True,
+                 confoverrides={'ros_prefetch': prefetch,
+                                'ros_prefetch_workers': workers})
+    app.connect('env-updated',
+                lambda app, env: marks.update(write=time.time()))
+    # the prefetch stage is a part of the read phase
+    start = time.time()
+    app.build()
+    return marks['write'] - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--packages', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    sphinxcontrib.ros.message.codecs = SlowCodecs(args.latency)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        doc_path = make_workspace(tmpdir, args.packages)
+        for prefetch in (None, 'documents', 'all'):
+            print('ros_prefetch = {0!s:9}: {1:8.3f} s'.format(
+                prefetch, min(measure_read(doc_path, prefetch, args.workers)
+                              for _ in range(args.repeat))))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+u"""
+    Benchmark of the read phase with the fields of the auto directives
+    made into the nodes directly or parsed as reST.
+
+    The workspace has the messages only, documented with the comments of
+    the fields, and it is read with ``ros_docfield_nodes`` on and off.
+
+    Usage::
+
+       $ python benchmarks/bench_read.py --packages 1000 --messages 5
+"""
+from __future__ import print_function
+
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sphinx.application import Sphinx  # noqa
+
+from workspace import make_workspace  # noqa
+
+
+def measure_read(doc_path, docfield_nodes):
+    u"""Measure the read phase of a fresh build, writing nothing
+    """
+    marks = {}
+    app = Sphinx(doc_path, doc_path, os.path.join(doc_path, '_build'),
+                 os.path.join(doc_path, '_build', '.doctrees'),
+                 'dummy', status=None, warning=io.StringIO(), freshenv=True,
+                 confoverrides={'ros_docfield_nodes': docfield_nodes})
+    app.connect('env-before-read-docs',
+                lambda app, env, docnames: marks.update(read=time.time()))
+    app.connect('env-updated',
+                lambda app, env: marks.update(write=time.time()))
+    app.build()
+    return marks['write'] - marks['read']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--packages', type=int, default=1000)
+    parser.add_argument('--messages', type=int, default=5)
+    parser.add_argument('--fields', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        doc_path = make_workspace(tmpdir, args.packages,
+                                  messages=args.messages, services=0,
+                                  actions=0, fields=args.fields)
+        print('{0} messages'.format(args.packages * args.messages))
+        results = {}
+        for docfield_nodes in (False, True):
+            results[docfield_nodes] = min(
+                measure_read(doc_path, docfield_nodes)
+                for _ in range(args.repeat))
+            print('ros_docfield_nodes = {0!s:5}: {1:8.3f} s'.format(
+                docfield_nodes, results[docfield_nodes]))
+        print('read phase: {0:+.0%}'.format(
+            results[True] / results[False] - 1))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+u"""
+    Generator of synthetic ROS workspaces for the benchmarks.
+
+    A workspace has ``src`` with the packages, grouped in directories, and
+    ``doc`` with a Sphinx project documenting all of them.
+
+    Usage::
+
+       $ python benchmarks/workspace.py /tmp/ws --packages 1000
+"""
+from __future__ import print_function
+
+import argparse
+import io
+import os
+
+MANIFEST = u"""<?xml version="1.0"?>
+<package>
+  <name>{name}</name>
+  <version>0.0.0</version>
+  <description>The {name} package</description>
+  <maintainer email="john@mail.com">John Smith</maintainer>
+  <license>BSD</license>
+  <buildtool_depend>catkin</buildtool_depend>
+{depends}</package>
+"""
+
+CONF = u"""import os
+master_doc = 'index'
+extensions = ['sphinxcontrib.ros']
+ros_base_path = [os.path.join(os.path.dirname(__file__), '..', 'src')]
+"""
+
+PAGE = u"""{name}
+{underline}
+
+.. ros:package:: {name}
+
+.. ros:autointerfaces:: {name}
+   :field-comment: up-all
+   :raw: tail
+
+{references}
+"""
+
+BUILTIN_FIELDS = ['bool', 'int32', 'uint8[]', 'float64', 'float64[9]',
+                  'string', 'time', 'duration']
+
+
+def package_name(index):
+    return 'pkg_{0}'.format(index)
+
+
+def make_comments(text, lines):
+    return [u'# {0} line {1}'.format(text, line) for line in range(lines)]
+
+
+def make_fields(index, fields, comment_lines, depends, messages):
+    u"""Make lines of fields, with the types of the depended packages
+    """
+    lines = []
+    for field in range(fields):
+        if depends and field % 3 == 0:
+            depend = depends[field // 3 % len(depends)]
+            field_type = '{0}/Msg{1}'.format(package_name(depend),
+                                             field % messages)
+        else:
+            field_type = BUILTIN_FIELDS[field % len(BUILTIN_FIELDS)]
+        lines.extend(make_comments('field_{0}'.format(field), comment_lines))
+        lines.append(u'{0} field_{1}  # right of field_{1}'.format(
+            field_type, field))
+        if field % 4 == 0:
+            lines.append(u'')
+    return lines
+
+
+def make_constants(constants):
+    return [u'int32 CONSTANT_{0}={0}  # constant {0}'.format(constant)
+            for constant in range(constants)]
+
+
+def make_type_file(index, groups, comment_lines):
+    u"""Make lines of a type file of groups, a list of (fields, constants)
+    """
+    lines = make_comments('description of {0}'.format(index), comment_lines)
+    lines.append(u'')
+    for group, (fields, constants) in enumerate(groups):
+        if group:
+            lines.append(u'---')
+        lines.extend(make_constants(constants))
+        lines.extend(fields)
+    return lines
+
+
+def write_lines(path, lines):
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(u'\n'.join(lines) + u'\n')
+
+
+def make_package(base_path, index, messages=3, services=1,
+                 actions=1, fields=12, constants=4, comment_lines=3,
+                 depends=2, groups=10):
+    u"""Make a package which depends on the previous packages
+
+    Returns the path of the package.
+    """
+    name = package_name(index)
+    package_path = os.path.join(base_path,
+                                'group_{0}'.format(index % groups), name)
+    depends = [index - i for i in range(1, depends + 1) if index - i >= 0]
+    os.makedirs(package_path)
+    write_lines(os.path.join(package_path, 'package.xml'), [
+        MANIFEST.format(name=name, depends=u''.join(
+            u'  <build_depend>{0}</build_depend>\n'
+            u'  <run_depend>{0}</run_depend>\n'.format(package_name(depend))
+            for depend in depends))])
+
+    def make(kind, count, ext, sizes):
+        if not count:
+            return
+        os.makedirs(os.path.join(package_path, ext))
+        for i in range(count):
+            field_groups = [(make_fields(index, size, comment_lines,
+                                         depends, messages), constants)
+                            for size in sizes]
+            write_lines(os.path.join(package_path, ext,
+                                     '{0}{1}.{2}'.format(kind, i, ext)),
+                        make_type_file(index, field_groups, comment_lines))
+    make('Msg', messages, 'msg', [fields])
+    make('Srv', services, 'srv', [fields // 2, fields // 2])
+    make('Action', actions, 'action', [fields // 3] * 3)
+    return package_path
+
+
+def make_workspace(path, packages, **kwargs):
+    u"""Make a workspace of the packages and a Sphinx project for them
+
+    The keyword arguments are passed to make_package. Returns the path of
+    the Sphinx project.
+    """
+    base_path = os.path.join(path, 'src')
+    doc_path = os.path.join(path, 'doc')
+    os.makedirs(doc_path)
+    for index in range(packages):
+        make_package(base_path, index, **kwargs)
+    write_lines(os.path.join(doc_path, 'conf.py'), [CONF])
+    names = [package_name(index) for index in range(packages)]
+    write_lines(os.path.join(doc_path, 'index.rst'),
+                [u'Workspace', u'=========', u'', u'.. toctree::', u''] +
+                [u'   ' + name for name in names])
+    for index, name in enumerate(names):
+        references = u' '.join(
+            u':ros:msg:`{0}/Msg0`'.format(package_name(depend))
+            for depend in range(max(index - 3, 0), index))
+        write_lines(os.path.join(doc_path, name + '.rst'),
+                    [PAGE.format(name=name, underline=u'=' * len(name),
+                                 references=references)])
+    return doc_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path')
+    parser.add_argument('--packages', type=int, default=100)
+    parser.add_argument('--messages', type=int, default=3)
+    parser.add_argument('--services', type=int, default=1)
+    parser.add_argument('--actions', type=int, default=1)
+    parser.add_argument('--fields', type=int, default=12)
+    parser.add_argument('--comment-lines', type=int, default=3)
+    args = parser.parse_args()
+    doc_path = make_workspace(args.path, args.packages,
+                              messages=args.messages,
+                              services=args.services,
+                              actions=args.actions,
+                              fields=args.fields,
+                              comment_lines=args.comment_lines)
+    print(doc_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -42,4 +42,10 @@ setup(
     install_requires=install_requires,
     tests_require=test_require,
     namespace_packages=['sphinxcontrib'],
+    entry_points={
+        'console_scripts': [
+            'sphinx-ros-index = sphinxcontrib.ros.prebuilt:main',
+            'sphinx-ros-watch = sphinxcontrib.ros.watch:main',
+        ],
+    },
 )
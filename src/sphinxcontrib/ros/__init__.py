@@ -11,15 +11,27 @@ u"""
 from __future__ import print_function
 
 import pkg_resources
+from docutils import nodes
+from sphinx import addnodes
 from sphinx.domains import Domain, ObjType
-from sphinx.locale import l_
+from sphinx.locale import _, l_
 from sphinx.roles import XRefRole
 from sphinx.util.nodes import make_refnode
 
-from .package import ROSPackage, ROSAutoPackage, add_formatter
+from .base import (ROSObjectDescription, init_package_index,
+                   save_package_index, init_profiler, report_profile,
+                   store_profile, merge_profile, log_warning, ros_used_by)
+from .package import (ROSPackage, ROSAutoPackage, ROSPackageGraph,
+                      add_formatter, init_depend_graph)
 from .message import (ROSMessage, ROSAutoMessage, ROSService,
-                      ROSAutoService, ROSAction, ROSAutoAction, ROSTypeLexer)
+                      ROSAutoService, ROSAction, ROSAutoAction,
+                      ROSAutoInterfaces, ROSTypeLexer, BUILTIN_TYPES,
+                      ros_raw_block, visit_raw_block, depart_raw_block,
+                      visit_raw_block_html, init_parse_cache,
+                      init_type_graph, report_parse_cache)
+from .inventory import open_inventories, write_ros_inventory
 from .api import ROSAPI
+from .prefetch import prefetch_type_files, clear_prefetched
 
 
 class ROSDomain(Domain):
@@ -38,12 +50,14 @@ class ROSDomain(Domain):
     directives = {
         'package': ROSPackage,
         'autopackage': ROSAutoPackage,
+        'packagegraph': ROSPackageGraph,
         'message':  ROSMessage,
         'automessage':  ROSAutoMessage,
         'service':  ROSService,
         'autoservice':  ROSAutoService,
         'action':  ROSAction,
         'autoaction':  ROSAutoAction,
+        'autointerfaces':  ROSAutoInterfaces,
         'node':  ROSAPI,
     }
     roles = {
@@ -54,48 +68,246 @@ class ROSDomain(Domain):
         'node':  XRefRole(),
     }
     initial_data = {
-        'objects': {}  # (objtype, name) -> docname
+        'objects': {},  # (objtype, name) -> docname
+        'docnames': {},  # docname -> set of (objtype, name)
+        'md5sums': {},  # (objtype, name) -> {field name: MD5 sum}
+        'references': {},  # (objtype, name) -> set of (role, target)
     }
+    data_version = 3
+
+    name_index = None
+    resolved = None
+    used_by = None
+    # (project name, base URI, inventory) of ``ros_inventories``
+    inventories = []
+
+    def note_object(self, objtype, name, docname):
+        fullname = (objtype, name)
+        objects = self.data['objects']
+        if fullname in objects:
+            self.data['docnames'].get(objects[fullname], set()).discard(
+                fullname)
+        objects[fullname] = docname
+        self.data['docnames'].setdefault(docname, set()).add(fullname)
+        self.name_index = None
+        self.used_by = None
+
+    def note_md5sums(self, objtype, name, md5sums):
+        u"""Note the MD5 sums of ROS1 of the type, as (field name, MD5 sum)
+        """
+        self.data['md5sums'][objtype, name] = dict(md5sums)
+
+    def get_md5sums(self, objtype, name):
+        return self.data['md5sums'].get((objtype, name), {})
+
+    def note_references(self, objtype, name, references):
+        u"""Note the references of the object, as (role, target)
+        """
+        self.data['references'][objtype, name] = set(references)
+        self.used_by = None
 
     def clear_doc(self, docname):
-        for fullname, fn in list(self.data['objects'].items()):
-            if fn == docname:
-                del self.data['objects'][fullname]
+        objects = self.data['objects']
+        for fullname in self.data['docnames'].pop(docname, ()):
+            if objects.get(fullname) == docname:
+                del objects[fullname]
+                self.data['md5sums'].pop(fullname, None)
+                self.data['references'].pop(fullname, None)
+        self.name_index = None
+        self.used_by = None
 
     def merge_domaindata(self, docnames, otherdata):
-        for fullname, docname in otherdata['objects'].items():
-            if docname in docnames:
-                self.data['objects'][fullname] = docname
+        for docname in docnames:
+            for objtype, name in otherdata['docnames'].get(docname, ()):
+                self.note_object(objtype, name, docname)
+                if (objtype, name) in otherdata['md5sums']:
+                    self.data['md5sums'][objtype, name] = \
+                        otherdata['md5sums'][objtype, name]
+                if (objtype, name) in otherdata['references']:
+                    self.note_references(
+                        objtype, name, otherdata['references'][objtype, name])
+
+    def get_name_index(self):
+        u"""Get the index of the object names
+
+        The index is made of the names, the names without the package name
+        and the lower-cased ones of both, each mapped to the list of
+        (objtype, name). It is built once the objects are settled.
+        """
+        if self.name_index is None:
+            names, short_names, lower_names = {}, {}, {}
+            for fullname in sorted(self.data['objects']):
+                name = fullname[1]
+                short_name = name.rsplit('/', 1)[-1]
+                names.setdefault(name, []).append(fullname)
+                short_names.setdefault(short_name, []).append(fullname)
+                lower_names.setdefault(name.lower(), []).append(fullname)
+                if short_name != name:
+                    lower_names.setdefault(short_name.lower(),
+                                           []).append(fullname)
+            self.name_index = (names, short_names, lower_names)
+            self.resolved = {}
+        return self.name_index
+
+    def get_used_by(self):
+        u"""Get the index of the users of the objects
+
+        The index maps (objtype, name) to the sorted list of the objects
+        referring to it, the packages depending on a package or the
+        interfaces and the nodes using an interface. It is built once the
+        objects are settled, from the references of all the objects.
+        """
+        if self.used_by is None:
+            used_by = {}
+            objects = self.data['objects']
+            for fullname, references in self.data['references'].items():
+                if fullname not in objects:
+                    continue
+                is_package = fullname[0] == 'package'
+                for role, target in references:
+                    for found in self.find_objects(
+                            target, self.objtypes_for_role(role) or []):
+                        if found != fullname and \
+                                (found[0] == 'package') == is_package:
+                            used_by.setdefault(found, set()).add(fullname)
+            self.used_by = dict((fullname, sorted(users))
+                                for fullname, users in used_by.items())
+        return self.used_by
+
+    def find_objects(self, target, objtypes):
+        u"""Find the objects of objtypes matching target
+
+        The exact names are looked up first, then the names without the
+        package name and finally the lower-cased names, except for the
+        builtin types like ``string`` not to match ``std_msgs/String``.
+        The results, even empty ones, are cached.
+        """
+        names, short_names, lower_names = self.get_name_index()
+        key = (target, tuple(objtypes))
+        if key not in self.resolved:
+            found = []
+            if target in BUILTIN_TYPES:
+                lookups = ((names, target),)
+            else:
+                lookups = ((names, target),
+                           (short_names, target),
+                           (lower_names, target.lower()))
+            for index, name in lookups:
+                found = [fullname for fullname in index.get(name, ())
+                         if fullname[0] in objtypes]
+                if found:
+                    break
+            self.resolved[key] = found
+        return self.resolved[key]
 
     def resolve_xref(self, env, fromdocname, builder, typ, target, node,
                      contnode):
-        objects = self.data['objects']
-        objtypes = self.objtypes_for_role(typ)
-        for objtype in objtypes:
-            if (objtype, target) in objects:
-                return make_refnode(builder, fromdocname,
-                                    objects[objtype, target],
-                                    objtype + '-' + target,
-                                    contnode, target)
+        with ROSObjectDescription.profiler.measure(
+                'resolve', typ, target.split('/', 1)[0]):
+            found = self.find_objects(target,
+                                      self.objtypes_for_role(typ) or [])
+        if not found:
+            return self.resolve_inventories(target,
+                                            self.objtypes_for_role(typ) or [],
+                                            contnode)
+        if len(found) > 1:
+            log_warning(env, 'more than one target found for %r: %s' %
+                        (target, ', '.join(name for _, name in found)),
+                        node)
+        objtype, name = found[0]
+        return make_refnode(builder, fromdocname,
+                            self.data['objects'][objtype, name],
+                            objtype + '-' + name,
+                            contnode, name)
 
     def resolve_any_xref(self, env, fromdocname, builder, target, node,
                          contnode):
         objects = self.data['objects']
         results = []
-        for objtype in self.object_types:
-            if (objtype, target) in self.data['objects']:
-                results.append(('ros:' + self.role_for_objtype(objtype),
-                                make_refnode(builder, fromdocname,
-                                             objects[objtype, target],
-                                             objtype + '-' + target,
-                                             contnode, target)))
+        with ROSObjectDescription.profiler.measure(
+                'resolve', 'any', target.split('/', 1)[0]):
+            found = self.find_objects(target, self.object_types)
+        for objtype, name in found:
+            results.append(('ros:' + self.role_for_objtype(objtype),
+                            make_refnode(builder, fromdocname,
+                                         objects[objtype, name],
+                                         objtype + '-' + name,
+                                         contnode, name)))
         return results
 
+    def resolve_inventories(self, target, objtypes, contnode):
+        u"""Resolve the reference with the inventories of the other projects
+        """
+        for project, base_uri, inventory in self.inventories:
+            for objtype in objtypes:
+                uri = inventory.lookup(objtype, target)
+                if uri is not None:
+                    node = nodes.reference(
+                        '', '', internal=False, refuri=base_uri + uri,
+                        reftitle='({0}) {1}'.format(project, target))
+                    node.append(contnode)
+                    return node
+        return None
+
     def get_objects(self):
         for (typ, name), docname in self.data['objects'].items():
             yield name, name, typ, docname, typ + '-' + name, 1
 
 
+def get_updated_used_by(app, env):
+    u"""Get the documents of the objects whose users have changed since
+    the last build, to be written again
+    """
+    used_by = env.get_domain('ros').get_used_by()
+    previous = getattr(env, 'ros_used_by', {})
+    env.ros_used_by = used_by
+    objects = env.get_domain('ros').data['objects']
+    return set(objects[fullname]
+               for fullname in set(used_by) | set(previous)
+               if fullname in objects and
+               used_by.get(fullname) != previous.get(fullname))
+
+
+def resolve_used_by(app, doctree, fromdocname):
+    u"""Replace the placeholders with the fields of the users
+    """
+    domain = app.env.get_domain('ros')
+    used_by = domain.get_used_by()
+    objects = domain.data['objects']
+    for placeholder in list(doctree.traverse(ros_used_by)):
+        users = used_by.get((placeholder['objtype'], placeholder['name']))
+        field_list = placeholder.parent
+        if not users:
+            field_list.remove(placeholder)
+            if not len(field_list):
+                field_list.parent.remove(field_list)
+            continue
+        paragraph = nodes.paragraph()
+        for objtype, name in users:
+            if len(paragraph):
+                paragraph += nodes.Text(', ')
+            paragraph += make_refnode(
+                app.builder, fromdocname, objects[objtype, name],
+                objtype + '-' + name,
+                addnodes.literal_emphasis(name, name), name)
+        label = _('Reverse Depends') if placeholder['objtype'] == 'package' \
+            else _('Used By')
+        placeholder.replace_self(nodes.field(
+            '', nodes.field_name('', label), nodes.field_body('', paragraph)))
+
+
+def init_inventories(app):
+    u"""Open the inventories of the other projects in ``ros_inventories``.
+    """
+    ROSDomain.inventories = open_inventories(app)
+
+
+def close_inventories(app, exception):
+    for project, base_uri, inventory in ROSDomain.inventories:
+        inventory.close()
+    ROSDomain.inventories = []
+
+
 def setup(app):
     u"""
     setup
@@ -120,14 +332,49 @@ def setup(app):
     ], True)
     app.add_config_value('ros_package_attrs_formatter', {}, True)
     app.add_config_value('ros_base_path', [], True)
+    app.add_config_value('ros_discovery_workers', 4, False)
+    app.add_config_value('ros_exclude_patterns', [], False)
+    app.add_config_value('ros_cache_dir', None, False)
+    app.add_config_value('ros_docfield_nodes', True, True)
+    app.add_config_value('ros_prebuilt_index', None, False)
+    app.add_config_value('ros_inventories', {}, False)
+    app.add_config_value('ros_used_by', True, True)
+    app.add_config_value('ros_prefetch', None, False)
+    app.add_config_value('ros_prefetch_workers', 8, False)
+    app.add_config_value('ros_profile', False, False)
+    app.add_config_value('ros_profile_top', 10, False)
     app.add_domain(ROSDomain)
     app.add_lexer("rostype", ROSTypeLexer())
+    app.add_node(ros_raw_block,
+                 html=(visit_raw_block_html, depart_raw_block),
+                 latex=(visit_raw_block, depart_raw_block),
+                 text=(visit_raw_block, depart_raw_block),
+                 man=(visit_raw_block, depart_raw_block),
+                 texinfo=(visit_raw_block, depart_raw_block))
+    app.connect('builder-inited', init_package_index)
+    app.connect('build-finished', save_package_index)
+    app.connect('builder-inited', init_parse_cache)
+    app.connect('builder-inited', init_type_graph)
+    app.connect('builder-inited', init_depend_graph)
+    app.connect('build-finished', report_parse_cache)
+    app.connect('env-before-read-docs', prefetch_type_files)
+    app.connect('build-finished', clear_prefetched)
+    app.connect('builder-inited', init_profiler)
+    app.connect('build-finished', report_profile)
+    app.connect('doctree-read', store_profile)
+    app.connect('env-merge-info', merge_profile)
+    app.connect('builder-inited', init_inventories)
+    app.connect('build-finished', write_ros_inventory)
+    app.connect('build-finished', close_inventories)
+    app.connect('env-get-updated', get_updated_used_by)
+    app.connect('doctree-resolved', resolve_used_by)
     try:
         version = pkg_resources.require('sphinxcontrib-ros')[0].version
     except pkg_resources.DistributionNotFound:
         version = '0.0.0'
     return {'version': version,
-            'parallel_read_safe': True}
+            'parallel_read_safe': True,
+            'parallel_write_safe': True}
 
 __all__ = [
     'add_formatter'
@@ -11,7 +11,11 @@ u"""
 from __future__ import print_function
 
 import os
+import re
 from docutils import nodes
+from docutils.parsers.rst.states import Body
+from docutils.statemachine import StringList
+import sphinx
 from sphinx import addnodes
 from sphinx.directives import ObjectDescription
 from sphinx.locale import _
@@ -20,8 +24,112 @@ try:
     unicode
 except:
     def unicode(s): return str(s)
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+try:
+    from sphinx.util import logging
+except ImportError:
+    logging = None
+
+from .index import ROSPackageIndex, INDEX_FILENAME
+from .profiler import ROSProfiler, PROFILE_FILENAME
+
+FIELD_MARKER = re.compile(Body.patterns['field_marker'])
+# the field names with these may have the inline markup
+FIELD_NAME_MARKUP = re.compile(r'_(\W|$)|[*`|\\]')
+# a line starting like this may begin an enumerated list
+ENUMERATOR = re.compile(r'(\d+|[a-zA-Z]|[ivxlcdm]+|[IVXLCDM]+)[.)](\s|$)')
+# make_field of the field types takes env since Sphinx 1.6
+MAKE_FIELD_ENV = sphinx.version_info >= (1, 6)
+
+
+def has_fields(content):
+    u"""Check if the content has field list lines
+    """
+    return any(FIELD_MARKER.match(line.lstrip()) for line in content)
+
+
+def format_docfields(docfields):
+    u"""Format the docfields into the lines of a field list
+
+    docfields are (field name, lines, source, offset), where lines are
+    StringList of the text following the field marker.
+    """
+    data = []
+    items = []
+    for name, lines, source, offset in docfields:
+        if lines and lines[0]:
+            data.append(u':{0}: {1}'.format(name, lines[0]))
+        else:
+            data.append(u':{0}:'.format(name))
+        items.append(get_marker_info(lines, source, offset))
+        data.extend(lines.data[1:])
+        items.extend(lines.items[1:])
+    return StringList(data, items=items)
+
+
+def get_marker_info(lines, source, offset):
+    u"""Get (source, offset) of the field marker line of the docfield
+
+    The marker is on the first line of the text if any.
+    """
+    if lines and lines[0]:
+        return lines.info(0)
+    return (source, offset)
+
+
+def get_field_body(lines):
+    u"""Get the lines of the field body as docutils reads them
+
+    The first line is stripped, the others are dedented, and the blank
+    lines at the both ends are removed.
+    """
+    rest = lines.data[1:]
+    indents = [len(line) - len(line.lstrip()) for line in rest
+               if line.strip()]
+    indent = min(indents) if indents else 0
+    data = [line.lstrip() for line in lines.data[:1]] + \
+        [line[indent:] for line in rest]
+    start, end = 0, len(data)
+    while start < end and not data[start].strip():
+        start += 1
+    while end > start and not data[end - 1].strip():
+        end -= 1
+    return StringList(data[start:end], items=lines.items[start:end])
+
+
+def get_body_source_and_line(body, lineno=None):
+    u"""Get (source, line) of the line of the field body, clamped on it
+    """
+    if lineno is None or not body:
+        return (None, None)
+    source, offset = body.info(max(0, min(lineno, len(body)) - 1))
+    return (source, offset + 1)
+
+
+def is_paragraph(lines):
+    u"""Check if the lines are surely parsed as a single paragraph
+    """
+    for line in lines:
+        if not line[:1].isalnum() or ENUMERATOR.match(line) or \
+                line.endswith('::'):
+            return False
+    return len(lines) > 0
 
-from catkin_pkg.packages import find_packages
+
+def is_single_paragraph(node):
+    u"""Check if the node has a paragraph and the system messages only
+    """
+    return len(node) > 0 and isinstance(node[0], nodes.paragraph) and \
+        all(isinstance(child, nodes.system_message) for child in node[1:])
+
+
+class ros_used_by(nodes.Element):
+    u"""Placeholder of the field of the users of an object, replaced at
+    doctree-resolved
+    """
 
 
 class GroupedFieldNoArg(Field):
@@ -33,7 +141,7 @@ class GroupedFieldNoArg(Field):
     def __init__(self, name, names=(), label=None, rolename=None):
         Field.__init__(self, name, names, label, False, rolename)
 
-    def make_field(self, types, domain, items):
+    def make_field(self, types, domain, items, env=None):
         fieldname = nodes.field_name('', self.label)
         listnode = self.list_type()
         for fieldarg, content in items:
@@ -42,33 +150,51 @@ class GroupedFieldNoArg(Field):
         return nodes.field('', fieldname, fieldbody)
 
 
+def resolve_base_paths(base_paths, srcdir):
+    u"""Get the absolute paths of the base paths relative to srcdir
+    """
+    if not base_paths:
+        base_paths = ['.']
+    return [base_path if base_path.startswith('/') else
+            os.path.join(srcdir, base_path)
+            for base_path in base_paths]
+
+
+def get_base_paths(env):
+    u"""Get the absolute paths of ``ros_base_path``
+    """
+    return resolve_base_paths(env.config.ros_base_path, env.srcdir)
+
+
+def get_packages(env):
+    u"""Get the packages in ``ros_base_path`` as a dict of name -> package
+    """
+    package_index = ROSObjectDescription.package_index
+    if package_index.packages is None:
+        package_index.update(get_base_paths(env),
+                             env.config.ros_discovery_workers)
+    return package_index.packages
+
+
+def find_package(env, name, base=None):
+    u"""Find the package in ``ros_base_path`` or under base if given
+    """
+    package_index = ROSObjectDescription.package_index
+    if base is not None:
+        base_abspath = env.relfn2path(base)[1]
+        return package_index.get_under(base_abspath, name)
+    return get_packages(env).get(name)
+
+
 class ROSObjectDescription(ObjectDescription):
     u"""ROS Object"""
-    _ros_packages = {}
+    package_index = None
+    profiler = ROSProfiler()
     doc_merge_fields = {}
 
     def find_package(self, name):
-        if 'base' in self.options and self.options['base'] is not None:
-            base_abspath = self.env.relfn2path(self.options['base'])[1]
-            packages = find_packages(base_abspath)
-            package = next((package for package in packages.values()
-                            if package.name == name), None)
-        else:
-            if not ROSObjectDescription._ros_packages:
-                packages = {}
-                base_paths = self.env.config.ros_base_path
-                if not base_paths:
-                    base_paths = ['.']
-                for base_path in base_paths:
-                    if base_path.startswith('/'):
-                        base_abspath = base_path
-                    else:
-                        base_abspath = os.path.join(self.env.srcdir, base_path)
-                    found_packages = find_packages(base_abspath)
-                    for package in found_packages.values():
-                        packages[package.name] = package
-                ROSObjectDescription._ros_packages = packages
-            package = ROSObjectDescription._ros_packages.get(name, None)
+        with self.profiler.measure('find_package', package=name):
+            package = find_package(self.env, name, self.options.get('base'))
         if not package:
             self.state_machine.reporter.warning(
                 'cannot find package %s' % name,
@@ -95,14 +221,18 @@ class ROSObjectDescription(ObjectDescription):
                     'other instance in ' +
                     self.env.doc2path(objects[fullname]),
                     line=self.lineno)
-            objects[fullname] = self.env.docname
+            self.env.get_domain('ros').note_object(self.objtype, name,
+                                                   self.env.docname)
         indextext = _('%s (ROS %s)') % (name, self.objtype)
         self.indexnode['entries'].append(('single', indextext,
                                           targetname,
                                           ''))
 
     def before_content(self):
-        content = self.update_content()
+        with self.profiler.measure('update_content'):
+            content = self.update_content()
+        # the content is parsed between before_content and after_content
+        self.profiler.begin('nested_parse')
         if content:
             self.content = content
             # save
@@ -118,6 +248,7 @@ class ROSObjectDescription(ObjectDescription):
             self.state.reporter.get_source_and_line = self.get_source_and_line
 
     def after_content(self):
+        self.profiler.end()
         if hasattr(self, 'tmp_backup'):
             # restore
             self.content_offset = self.tmp_backup['content_offset']
@@ -140,8 +271,158 @@ class ROSObjectDescription(ObjectDescription):
     def merge_field(self, src_node, dest_node):
         pass
 
+    def get_package_name(self):
+        u"""Get the package name of the object for the profiler
+        """
+        return self.arguments[0].strip().split('/', 1)[0]
+
+    def get_field_type_map(self):
+        typemap = {}
+        for field_type in self.doc_field_types:
+            for name in field_type.names:
+                typemap[name] = (field_type, False)
+            if field_type.is_typed:
+                for name in field_type.typenames:
+                    typemap[name] = (field_type, True)
+        return typemap
+
+    def parse_field_body(self, lines):
+        u"""Parse the lines of a field body into field_body
+
+        The lines of a single paragraph are parsed only for the inline
+        markup.
+        """
+        body = get_field_body(lines)
+        text = u'\n'.join(body.data)
+        field_body = nodes.field_body(text)
+        # the source lines are taken from the body as in before_content
+        backup = (self.state.state_machine.input_lines,
+                  self.state.reporter.get_source_and_line)
+        self.state.state_machine.input_lines = body
+        self.state.reporter.get_source_and_line = \
+            lambda lineno=None: get_body_source_and_line(body, lineno)
+        try:
+            if is_paragraph(body):
+                # the messages refer to the first line as docutils does
+                textnodes, messages = self.state.inline_text(text, 1)
+                paragraph = nodes.paragraph(text, '', *textnodes)
+                paragraph.source, paragraph.line = \
+                    get_body_source_and_line(body, 1)
+                field_body += paragraph
+                field_body += messages
+            else:
+                self.state.nested_parse(body, 0, field_body)
+        finally:
+            (self.state.state_machine.input_lines,
+             self.state.reporter.get_source_and_line) = backup
+        return field_body
+
+    def make_field_list(self, docfields):
+        u"""Make the field list of the docfields without parsing them
+
+        The field list is the same as the one DocFieldTransformer makes
+        from the lines of :func:`format_docfields`.
+        """
+        typemap = self.get_field_type_map()
+        entries = []
+        groupindices = {}
+        types = {}
+        for name, lines, source, offset in docfields:
+            if FIELD_NAME_MARKUP.search(name):
+                # the inline markup is removed from the field name
+                name = u''.join(node.astext() for node in
+                                self.state.inline_text(name, self.lineno)[0])
+            field_name, field_arg = (name.split(None, 1) + [u''])[:2]
+            field_body = self.parse_field_body(lines)
+            field_type, is_type_field = typemap.get(field_name, (None, None))
+            if field_type is None or field_type.has_arg != bool(field_arg):
+                # an unknown field is kept with the capitalized name
+                entries.append(nodes.field(
+                    '', nodes.field_name('', name[:1].upper() + name[1:]),
+                    field_body))
+                continue
+            if is_single_paragraph(field_body):
+                content = field_body[0].children
+            else:
+                content = field_body.children
+            if is_type_field:
+                content = [node for node in content
+                           if isinstance(node, (nodes.Inline, nodes.Text))]
+                if content:
+                    types.setdefault(field_type.name, {})[field_arg] = content
+                continue
+            translatable_content = nodes.inline(field_body.rawsource,
+                                                translatable=True)
+            translatable_content.document = self.state.document
+            # at the marker line, as the field of format_docfields
+            source, offset = get_marker_info(lines, source, offset)
+            translatable_content.source = source
+            translatable_content.line = offset + 1
+            translatable_content += content
+            entry = field_type.make_entry(field_arg, [translatable_content])
+            if not field_type.is_grouped:
+                entries.append([field_type, entry])
+                continue
+            if field_type.name not in groupindices:
+                groupindices[field_type.name] = len(entries)
+                entries.append([field_type, []])
+            entries[groupindices[field_type.name]][1].append(entry)
+        field_list = nodes.field_list()
+        for entry in entries:
+            if isinstance(entry, nodes.field):
+                field_list += entry
+                continue
+            field_type, items = entry
+            args = (types.get(field_type.name, {}), self.domain, items)
+            if MAKE_FIELD_ENV:
+                field_list += field_type.make_field(*args, env=self.env)
+            else:
+                field_list += field_type.make_field(*args)
+        return field_list
+
     def run(self):
-        node = ObjectDescription.run(self)
+        # the docfields set by update_content are made into the nodes
+        self.docfields = []
+        # objtype is set in ObjectDescription.run
+        with self.profiler.measure('run', self.name.split(':', 1)[-1],
+                                   self.get_package_name()):
+            node = ObjectDescription.run(self)
+            if self.docfields:
+                with self.profiler.measure('make_field_list'):
+                    node[1][-1].insert(
+                        0, self.make_field_list(self.docfields))
+            with self.profiler.measure('merge_fields'):
+                self.merge_fields(node)
+            if self.names and 'noindex' not in self.options:
+                with self.profiler.measure('note_references'):
+                    self.note_references(node)
+        return node
+
+    def get_references(self, contentnode):
+        u"""Get the set of (role, target) of the ROS objects referred to
+        """
+        return set((xref['reftype'], xref['reftarget'])
+                   for xref in contentnode.traverse(addnodes.pending_xref)
+                   if xref.get('refdomain') == 'ros')
+
+    def note_references(self, node):
+        u"""Note the references of the object to list the users of the
+        referred objects, and add the placeholder of its own users
+        """
+        contentnode = node[1][-1]
+        self.env.get_domain('ros').note_references(
+            self.objtype, self.names[0], self.get_references(contentnode))
+        if not self.env.config.ros_used_by:
+            return
+        placeholder = ros_used_by(objtype=self.objtype, name=self.names[0])
+        for child in contentnode:
+            if isinstance(child, nodes.field_list):
+                child += placeholder
+                break
+        else:
+            contentnode.insert(0, nodes.field_list('', placeholder))
+
+    def merge_fields(self, node):
         contentnode = node[1][-1]
         # label is the key to find the field-value
         labelmap = {field_type.name: unicode(field_type.label)  # name -> label
@@ -158,22 +439,115 @@ class ROSObjectDescription(ObjectDescription):
         # :constant CONST: description
         # :constant-type CONST: int32
         # :constant-value: value
+        # the items are looked up by the names in one pass
         for field_src, field_dest in self.doc_merge_fields.items():
-            # name -> label -> field_node
-            label_src = labelmap[field_src]
-            if label_src in field_nodes:
-                field_node_src = field_nodes[label_src]
-                label_dest = labelmap[field_dest]
-                if label_dest in field_nodes:
-                    field_node_dest = field_nodes[label_dest]
-                    for item_src in field_node_src[1][0]:
-                        name = item_src[0][0].astext()
-                        for item_dest in field_node_dest[1][0]:
-                            if name == item_dest[0][0].astext():
-                                # merge first paragraph
-                                self.merge_field(item_src[0],
-                                                 item_dest[0])
-                for child in contentnode:
-                    if isinstance(child, nodes.field_list):
-                        child.remove(field_node_src)
-        return node
+            field_node_src = field_nodes.get(labelmap[field_src])
+            if field_node_src is None:
+                continue
+            field_node_dest = field_nodes.get(labelmap[field_dest])
+            if field_node_dest is not None:
+                # name -> first paragraphs of the destination items
+                items_dest = {}
+                for item_dest in field_node_dest[1][0]:
+                    items_dest.setdefault(item_dest[0][0].astext(),
+                                          []).append(item_dest[0])
+                for item_src in field_node_src[1][0]:
+                    for paragraph in items_dest.get(item_src[0][0].astext(),
+                                                    ()):
+                        self.merge_field(item_src[0], paragraph)
+            field_node_src.parent.remove(field_node_src)
+
+
+def log_info(app, message):
+    u"""Log an informational message of the build
+    """
+    if logging is not None:
+        logging.getLogger(__name__).info(message)
+    else:
+        app.info(message)
+
+
+def log_warning(env, message, node):
+    u"""Log a warning about the node
+    """
+    if logging is not None:
+        logging.getLogger(__name__).warning(message, location=node)
+    else:
+        env.warn_node(message, node)
+
+
+def init_package_index(app):
+    u"""Load the package index saved by the previous build and update it.
+
+    The index of ``ros_prebuilt_index`` is used instead if it is valid.
+    The index is updated before the parallel readers are forked to be
+    shared by all of them.
+    """
+    filename = os.path.join(app.doctreedir, INDEX_FILENAME)
+    package_index = ROSPackageIndex(filename,
+                                    app.config.ros_exclude_patterns)
+    base_paths = get_base_paths(app.env)
+    prebuilt = app.config.ros_prebuilt_index
+    if prebuilt:
+        try:
+            package_index.load_prebuilt(
+                os.path.join(app.confdir, prebuilt), base_paths)
+        except ValueError as e:
+            log_info(app, 'ros prebuilt index is not used: {0}'.format(e))
+            prebuilt = None
+    if not prebuilt:
+        package_index.load()
+        package_index.update(base_paths, app.config.ros_discovery_workers)
+        if package_index.crawled[0]:
+            log_info(app, 'ros package discovery: {0} directories visited, '
+                     '{1} pruned'.format(*package_index.crawled))
+    if getattr(app, 'parallel', 0) > 1:
+        package_index.index_interfaces()
+    ROSObjectDescription.package_index = package_index
+
+
+def save_package_index(app, exception):
+    u"""Save the package index for the next build.
+    """
+    package_index = ROSObjectDescription.package_index
+    if package_index is not None and exception is None:
+        package_index.save()
+
+
+def init_profiler(app):
+    u"""Create the profiler enabled by ``ros_profile``.
+    """
+    profiler = ROSProfiler(bool(app.config.ros_profile))
+    profiler.start()
+    ROSObjectDescription.profiler = profiler
+
+
+def report_profile(app, exception):
+    u"""Save the profile and log the top entries of ``ros_profile_top``.
+    """
+    profiler = ROSObjectDescription.profiler
+    if not profiler.enabled:
+        return
+    profiler.stop()
+    filename = app.config.ros_profile
+    if not isinstance(filename, string_types):
+        filename = PROFILE_FILENAME
+    profiler.save(os.path.join(app.outdir, filename))
+    for line in profiler.summary(app.config.ros_profile_top):
+        log_info(app, line)
+
+
+def store_profile(app, doctree):
+    u"""Store the profile of a parallel reader in the environment
+    """
+    profiler = ROSObjectDescription.profiler
+    if profiler.enabled and profiler.is_forked():
+        app.env.ros_profile_stats = profiler.stats
+
+
+def merge_profile(app, env, docnames, other):
+    u"""Merge the profile of a parallel reader
+    """
+    stats = getattr(other, 'ros_profile_stats', None)
+    if stats:
+        ROSObjectDescription.profiler.merge(stats)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+u"""
+    sphinxcontrib.ros.cache
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Content-addressed cache of parsed type files.
+
+    :copyright: Copyright 2015 by Tamaki Nishino.
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+CACHE_VERSION = 5
+
+
+def make_key(*values):
+    u"""Make a cache key from the hash of the values
+    """
+    sha1 = hashlib.sha1(str(CACHE_VERSION).encode('utf-8'))
+    for value in values:
+        sha1.update(b'\0')
+        sha1.update(value.encode('utf-8'))
+    return sha1.hexdigest()
+
+
+def make_parse_key(type_file, file_path, file_content, package_name):
+    u"""Make the key of the parsed type file
+
+    The file path is a part of the key as the parsed lines refer to it.
+    """
+    return make_key(type_file.ext, package_name, file_path,
+                    u'\n'.join(file_content.data))
+
+
+def compress(value):
+    return zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def decompress(data):
+    return pickle.loads(zlib.decompress(data))
+
+
+class ROSParseCache(object):
+    u"""Cache of the parsed field groups keyed by the file content hash.
+
+    The entries are kept in a in-memory LRU cache and, if cache_dir is
+    given, in files under cache_dir, which can be shared by the builds.
+    The compressed entries of a prebuilt index can be preloaded as well.
+    The entries and the counts are guarded by a lock, as the prefetcher
+    parses the files from its threads.
+    """
+    def __init__(self, cache_dir=None, size=1024):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.entries = OrderedDict()
+        self.prebuilt = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key[2:] + '.pickle')
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.pop(key, None)
+            if value is not None:
+                self.entries[key] = value
+                self.hits += 1
+                return value
+        value = self.load(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.remember(key, value)
+            self.disk_hits += 1
+        return value
+
+    def load(self, key):
+        u"""Load the entry of the prebuilt index or of cache_dir, or None
+        """
+        if key in self.prebuilt:
+            return decompress(self.prebuilt[key])
+        if self.cache_dir:
+            try:
+                with open(self.get_path(key), 'rb') as f:
+                    return pickle.load(f)
+            except Exception:
+                pass
+        return None
+
+    def set(self, key, value):
+        with self.lock:
+            self.remember(key, value)
+        if self.cache_dir:
+            path = self.get_path(key)
+            dirname = os.path.dirname(path)
+            try:
+                if not os.path.isdir(dirname):
+                    os.makedirs(dirname)
+                # write to a temporary file to be safe with parallel builds
+                fd, tmp_path = tempfile.mkstemp(dir=dirname)
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+                os.rename(tmp_path, path)
+            except (IOError, OSError):
+                pass
+
+    def preload(self, entries):
+        u"""Preload the entries compressed by :func:`compress`
+        """
+        self.prebuilt.update(entries)
+
+    def reserve(self, size):
+        u"""Keep at least size entries in memory
+        """
+        self.size = max(self.size, size)
+
+    def remember(self, key, value):
+        u"""Keep the entry in memory, with the lock held
+        """
+        self.entries[key] = value
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def parse(self, type_file, file_path, file_content, package_name):
+        u"""Parse the file content with type_file, using the cache
+        """
+        key = make_parse_key(type_file, file_path, file_content,
+                             package_name)
+        field_groups = self.get(key)
+        if field_groups is None:
+            field_groups = type_file.parse(file_content, package_name)
+            self.set(key, field_groups)
+        return field_groups
+
+    def summary(self, name='parse'):
+        return ('ros {0} cache: {1} hits ({2} from disk), '
+                '{3} misses'.format(name, self.hits + self.disk_hits,
+                                    self.disk_hits, self.misses))
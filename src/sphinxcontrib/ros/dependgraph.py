@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+u"""
+    sphinxcontrib.ros.dependgraph
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Graph of the package dependencies.
+
+    :copyright: Copyright 2015 by Tamaki Nishino.
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+# kind -> attributes of the package
+DEPEND_KINDS = {
+    'build': ('build_depends', 'buildtool_depends'),
+    'exec': ('exec_depends', 'run_depends'),
+}
+
+
+def kinds_option(argument):
+    u"""Parse the kinds of the dependencies, all of them if empty
+    """
+    kinds = (argument or '').split()
+    for kind in kinds:
+        if kind not in DEPEND_KINDS:
+            raise ValueError('"{0}" unknown; choose from "{1}"'.format(
+                kind, '", "'.join(sorted(DEPEND_KINDS))))
+    return tuple(sorted(set(kinds))) or tuple(sorted(DEPEND_KINDS))
+
+
+def quote(name):
+    return u'"{0}"'.format(name.replace('"', '\\"'))
+
+
+class ROSDependGraph(object):
+    u"""Build-wide graph of the package dependencies.
+
+    find_package is called with a package name and returns the package,
+    or None if not found. The transitive dependencies and the depths are
+    computed once for each package and kinds, over the strongly connected
+    components of the graph, so that the whole workspace is traversed
+    only once. The dot sources are memoized as well.
+    """
+    def __init__(self, find_package):
+        self.find_package = find_package
+        self.depends = {}  # (name, kinds) -> sorted direct dependencies
+        self.closures = {}  # (name, kinds) -> all the dependencies
+        self.depths = {}  # (name, kinds) -> longest chain of dependencies
+        self.dots = {}  # (names, kinds) -> dot source
+
+    def get_depends(self, name, kinds):
+        u"""Get the direct dependencies of the package
+        """
+        key = (name, kinds)
+        if key not in self.depends:
+            package = self.find_package(name)
+            self.depends[key] = sorted(set(
+                depend.name
+                for kind in kinds for attr in DEPEND_KINDS[kind]
+                for depend in getattr(package, attr, None) or ()))
+        return self.depends[key]
+
+    def get_closure(self, name, kinds):
+        u"""Get the frozenset of all the dependencies of the package
+        """
+        if (name, kinds) not in self.closures:
+            self.traverse(name, kinds)
+        return self.closures[name, kinds]
+
+    def get_depth(self, name, kinds):
+        u"""Get the depth of the package, 0 if it has no dependencies
+
+        The packages depending on each other have the same depth.
+        """
+        if (name, kinds) not in self.depths:
+            self.traverse(name, kinds)
+        return self.depths[name, kinds]
+
+    def traverse(self, root, kinds):
+        u"""Settle the packages reachable from root, by Tarjan's algorithm
+
+        The components are found in the reverse topological order, so the
+        dependencies of each component are already settled.
+        """
+        index = {root: 0}
+        lowlink = {root: 0}
+        stack = [root]
+        on_stack = set(stack)
+        work = [(root, iter(self.get_depends(root, kinds)))]
+        while work:
+            name, depends = work[-1]
+            for depend in depends:
+                if (depend, kinds) in self.closures:
+                    continue
+                if depend not in index:
+                    index[depend] = lowlink[depend] = len(index)
+                    stack.append(depend)
+                    on_stack.add(depend)
+                    work.append((depend,
+                                 iter(self.get_depends(depend, kinds))))
+                    break
+                if depend in on_stack:
+                    lowlink[name] = min(lowlink[name], index[depend])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[name])
+                if lowlink[name] == index[name]:
+                    component = []
+                    while not component or component[-1] != name:
+                        component.append(stack.pop())
+                        on_stack.discard(component[-1])
+                    self.settle(component, kinds)
+
+    def settle(self, component, kinds):
+        u"""Compute the dependencies and the depth of the component
+        """
+        members = set(component)
+        closure = set()
+        depth = 0
+        for member in component:
+            for depend in self.get_depends(member, kinds):
+                if depend in members:
+                    continue
+                closure.add(depend)
+                closure.update(self.closures[depend, kinds])
+                depth = max(depth, self.depths[depend, kinds] + 1)
+        for member in component:
+            # the members of a cycle depend on each other
+            self.closures[member, kinds] = frozenset(
+                closure.union(members) if len(members) > 1 or
+                member in self.get_depends(member, kinds) else closure)
+            self.depths[member, kinds] = depth
+
+    def get_dot(self, names, kinds):
+        u"""Get the dot source of the graph of the packages and of all
+        their dependencies
+        """
+        key = (tuple(names), kinds)
+        if key not in self.dots:
+            packages = set(names)
+            for name in names:
+                packages.update(self.get_closure(name, kinds))
+            lines = [u'digraph depends {',
+                     u'  node [shape=box, fontsize=10];']
+            for name in sorted(packages):
+                attrs = u' [style=bold]' if name in names else u''
+                if self.find_package(name) is None:
+                    attrs = u' [style=dashed]'
+                lines.append(u'  {0}{1};'.format(quote(name), attrs))
+            for name in sorted(packages):
+                lines.extend(u'  {0} -> {1};'.format(quote(name),
+                                                     quote(depend))
+                             for depend in self.get_depends(name, kinds))
+            lines.append(u'}')
+            self.dots[key] = u'\n'.join(lines) + u'\n'
+        return self.dots[key]
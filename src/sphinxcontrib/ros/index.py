@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+u"""
+    sphinxcontrib.ros.index
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Persistent package index.
+
+    :copyright: Copyright 2015 by Tamaki Nishino.
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+import hashlib
+import os
+import pickle
+import tempfile
+from fnmatch import fnmatch
+from multiprocessing.pool import ThreadPool
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+from catkin_pkg.package import parse_package, PACKAGE_MANIFEST_FILENAME
+
+INDEX_FILENAME = 'ros_packages.pickle'
+INDEX_VERSION = 2
+PREBUILT_FILENAME = 'ros_index.pickle'
+PREBUILT_VERSION = 2
+INTERFACE_EXTS = ('msg', 'srv', 'action')
+IGNORE_MARKERS = ('CATKIN_IGNORE', 'COLCON_IGNORE', 'AMENT_IGNORE')
+
+
+def list_dir(dirpath):
+    u"""List the names of the files and of the directories in dirpath
+
+    The symbolic links to directories are listed as directories.
+    """
+    filenames = []
+    dirnames = []
+    if scandir is not None:
+        for entry in scandir(dirpath):
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            (dirnames if is_dir else filenames).append(entry.name)
+    else:
+        for name in os.listdir(dirpath):
+            if os.path.isdir(os.path.join(dirpath, name)):
+                dirnames.append(name)
+            else:
+                filenames.append(name)
+    return filenames, dirnames
+
+
+def is_excluded(relpath, exclude):
+    u"""Check if the directory matches one of the exclude patterns
+
+    The patterns are matched with the name and with the path relative to
+    the base path of the directory.
+    """
+    name = relpath.rsplit('/', 1)[-1]
+    return any(fnmatch(name, pattern) or fnmatch(relpath, pattern)
+               for pattern in exclude)
+
+
+def crawl(basepath, split=False, exclude=(), relpath=''):
+    u"""Find package manifests under basepath
+
+    Returns the list of the manifest paths, the modification times of
+    the visited directories, which are used to revalidate the result,
+    (path, relpath) of the sub-directories of basepath left to be crawled
+    separately if split is True, and the numbers of the visited and of the
+    pruned directories.
+    relpath is the path of basepath relative to the base path where the
+    exclude patterns are matched.
+    The traversal follows :func:`catkin_pkg.packages.find_package_paths`,
+    except that it does not descend into the packages, the hidden
+    directories, the directories with one of the ignore markers, and the
+    ones matching the exclude patterns.
+    """
+    manifests = []
+    dirs = {}
+    subtrees = []
+    visited = pruned = 0
+    stack = [(basepath, relpath)]
+    while stack:
+        dirpath, relpath = stack.pop()
+        try:
+            dirs[dirpath] = os.stat(dirpath).st_mtime
+            filenames, dirnames = list_dir(dirpath)
+        except OSError:
+            continue
+        visited += 1
+        if any(marker in filenames for marker in IGNORE_MARKERS):
+            pruned += len(dirnames)
+            continue
+        if PACKAGE_MANIFEST_FILENAME in filenames:
+            manifests.append(os.path.join(dirpath,
+                                          PACKAGE_MANIFEST_FILENAME))
+            pruned += len(dirnames)
+            continue
+        children = []
+        for dirname in sorted(dirnames):
+            child_relpath = relpath + '/' + dirname if relpath else dirname
+            if dirname.startswith('.') or is_excluded(child_relpath,
+                                                      exclude):
+                pruned += 1
+            else:
+                children.append((os.path.join(dirpath, dirname),
+                                 child_relpath))
+        if split and dirpath == basepath:
+            subtrees = children
+        else:
+            # depth-first in the sorted order
+            stack.extend(reversed(children))
+    return manifests, dirs, subtrees, (visited, pruned)
+
+
+def list_interfaces(package_path, ext):
+    u"""List the names of the interface files of ext in the package
+    """
+    try:
+        file_names = os.listdir(os.path.join(package_path, ext))
+    except OSError:
+        return []
+    suffix = '.' + ext
+    return sorted(file_name[:-len(suffix)] for file_name in file_names
+                  if file_name.endswith(suffix))
+
+
+def get_listing(dirpath):
+    u"""Get the sorted names in dirpath, or None if it cannot be listed
+    """
+    try:
+        filenames, dirnames = list_dir(dirpath)
+    except OSError:
+        return None
+    return sorted(filenames + dirnames)
+
+
+def hash_file(path):
+    u"""Get the SHA-1 of the content of the file
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def is_unchanged(dirs):
+    u"""Check if none of the directories has been modified
+    """
+    for dirpath, mtime in dirs.items():
+        try:
+            if os.stat(dirpath).st_mtime != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+class ROSPackageIndex(object):
+    u"""Index of the packages found under the base paths.
+
+    The index is saved in the doctree directory and revalidated with
+    ``os.stat`` on the next build, so that only the modified manifests
+    are parsed again. The directories matching the exclude patterns are
+    not crawled.
+    """
+    def __init__(self, filename=None, exclude=()):
+        self.filename = filename
+        self.exclude = list(exclude)
+        self.roots = {}      # base path -> (manifest paths, {dir: mtime})
+        self.manifests = {}  # manifest path -> (mtime, size, package)
+        self.packages = None  # name -> package
+        self.base_packages = {}  # base path -> {name: package or None}
+        self.interfaces = {}  # (package path, ext) -> type names
+        # parse cache key -> compressed field groups of the prebuilt index
+        self.parsed = {}
+        self.crawled = [0, 0]  # numbers of the visited and pruned dirs
+        self.modified = False
+
+    def load(self):
+        if not self.filename or not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, 'rb') as f:
+                version, exclude, roots, manifests = pickle.load(f)
+        except Exception:
+            # broken or incompatible index, start from scratch
+            return
+        if version == INDEX_VERSION:
+            # the directories are crawled again with the other patterns
+            if exclude == self.exclude:
+                self.roots = roots
+            self.manifests = manifests
+
+    def save(self):
+        if not self.filename or not self.modified:
+            return
+        dirname = os.path.dirname(self.filename)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with open(self.filename, 'wb') as f:
+            pickle.dump((INDEX_VERSION, self.exclude, self.roots,
+                         self.manifests), f, pickle.HIGHEST_PROTOCOL)
+        self.modified = False
+
+    def find_manifests(self, basepath):
+        u"""Get the manifest paths under basepath
+
+        The directories are crawled only if one of them has been modified
+        since the last crawl.
+        """
+        if basepath in self.roots:
+            manifests, dirs = self.roots[basepath]
+            if is_unchanged(dirs):
+                return manifests
+        manifests, dirs, _, crawled = crawl(basepath, exclude=self.exclude)
+        self.count_crawled(crawled)
+        self.roots[basepath] = (manifests, dirs)
+        self.modified = True
+        return manifests
+
+    def count_crawled(self, crawled):
+        self.crawled[0] += crawled[0]
+        self.crawled[1] += crawled[1]
+
+    def parse_manifest(self, path):
+        u"""Get the package of the manifest
+
+        The manifest is parsed only if its mtime or size has changed.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        entry = self.manifests.get(path)
+        if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+            return entry[2]
+        package = parse_package(path)
+        self.manifests[path] = (stat.st_mtime, stat.st_size, package)
+        self.modified = True
+        return package
+
+    def find_packages(self, basepath):
+        u"""Get the packages under basepath as a dict of name -> package
+        """
+        packages = {}
+        for path in self.find_manifests(basepath):
+            package = self.parse_manifest(path)
+            if package and package.name not in packages:
+                packages[package.name] = package
+        return packages
+
+    def update(self, base_paths, workers=1):
+        u"""Revalidate the index against the base paths
+
+        With more than one worker, the base paths are revalidated, crawled
+        and parsed by a thread pool, the large ones being split into their
+        sub-trees. If a package is found under several base paths, the
+        first one wins.
+        """
+        if workers > 1 and base_paths:
+            pool = ThreadPool(workers)
+            try:
+                paths = [path for paths in
+                         self.find_manifests_parallel(base_paths, pool)
+                         for path in paths]
+                found = pool.map(self.parse_manifest, paths)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            paths = [path for base_path in base_paths
+                     for path in self.find_manifests(base_path)]
+            found = [self.parse_manifest(path) for path in paths]
+        packages = {}
+        for package in found:
+            if package and package.name not in packages:
+                packages[package.name] = package
+        self.packages = packages
+
+    def find_manifests_parallel(self, base_paths, pool):
+        u"""Get the manifest paths under each of the base paths
+
+        Only the top directories of the modified base paths are crawled
+        here, their sub-trees are crawled by the pool.
+        """
+        valid = pool.map(
+            lambda base_path: (base_path in self.roots and
+                               is_unchanged(self.roots[base_path][1])),
+            base_paths)
+        tops = {}
+        subtrees = []
+        for base_path, is_valid in zip(base_paths, valid):
+            if not is_valid and base_path not in tops:
+                tops[base_path] = crawl(base_path, split=True,
+                                        exclude=self.exclude)
+                subtrees.extend(tops[base_path][2])
+        crawled = dict(zip(subtrees, pool.map(
+            lambda subtree: crawl(subtree[0], exclude=self.exclude,
+                                  relpath=subtree[1]), subtrees)))
+        for base_path, (manifests, dirs, top_subtrees, top_crawled) \
+                in tops.items():
+            manifests = list(manifests)
+            self.count_crawled(top_crawled)
+            for subtree in top_subtrees:
+                manifests.extend(crawled[subtree][0])
+                dirs.update(crawled[subtree][1])
+                self.count_crawled(crawled[subtree][3])
+            self.roots[base_path] = (manifests, dirs)
+            self.modified = True
+        return [self.roots[base_path][0] for base_path in base_paths]
+
+    def get(self, name):
+        return self.packages.get(name) if self.packages else None
+
+    def get_under(self, basepath, name):
+        u"""Get the package under basepath
+
+        The packages under basepath are looked up only once, and misses
+        are memoized as well.
+        """
+        packages = self.base_packages.get(basepath)
+        if packages is None:
+            packages = self.find_packages(basepath)
+            self.base_packages[basepath] = packages
+        if name not in packages:
+            packages[name] = None
+        return packages[name]
+
+    def get_interfaces(self, package_path, ext):
+        u"""Get the names of the interface files of ext in the package
+
+        The interface directories are listed only once.
+        """
+        key = (package_path, ext)
+        if key not in self.interfaces:
+            self.interfaces[key] = list_interfaces(package_path, ext)
+        return self.interfaces[key]
+
+    def index_interfaces(self):
+        u"""List the interface files of all the packages at once
+        """
+        for package in (self.packages or {}).values():
+            package_path = os.path.dirname(package.filename)
+            for ext in INTERFACE_EXTS:
+                self.get_interfaces(package_path, ext)
+
+    def save_prebuilt(self, filename, base_paths, parsed):
+        u"""Save the packages, the interfaces and the parsed field groups
+
+        The index is saved with the hashes of the manifests, the listings
+        of the crawled directories other than the packages and the
+        listings of the interface directories, to be validated by
+        :meth:`load_prebuilt` in another workspace, where the mtimes
+        differ.
+        """
+        manifests = [path for base_path in base_paths
+                     for path in self.roots[base_path][0]]
+        package_paths = set(os.path.dirname(path) for path in manifests)
+        dirs = sorted(set(dirpath for base_path in base_paths
+                          for dirpath in self.roots[base_path][1]
+                          if dirpath not in package_paths))
+        data = {
+            'version': PREBUILT_VERSION,
+            'base_paths': list(base_paths),
+            'exclude': self.exclude,
+            'manifests': [(path, hash_file(path), self.manifests[path][2])
+                          for path in manifests],
+            'dirs': [(dirpath, get_listing(dirpath)) for dirpath in dirs],
+            'interfaces': self.interfaces,
+            'parsed': parsed,
+        }
+        dirname = os.path.dirname(os.path.abspath(filename))
+        fd, tmp_path = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, filename)
+
+    def load_prebuilt(self, filename, base_paths):
+        u"""Load the index saved by :meth:`save_prebuilt`
+
+        The index is valid if it was built for the same base paths, the
+        contents of the manifests are unchanged and no package nor
+        interface file has been added or removed; raises ValueError with
+        the reason otherwise. The parsed field groups are decompressed
+        only when they are used.
+        """
+        try:
+            with open(filename, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            raise ValueError('cannot load {0}: {1}'.format(filename, e))
+        if not isinstance(data, dict) or \
+                data.get('version') != PREBUILT_VERSION:
+            raise ValueError('incompatible version')
+        if data['base_paths'] != list(base_paths):
+            raise ValueError('built for other base paths')
+        if data['exclude'] != self.exclude:
+            raise ValueError('built for other exclude patterns')
+        packages = {}
+        for path, sha1, package in data['manifests']:
+            try:
+                if hash_file(path) != sha1:
+                    raise ValueError('modified manifest ' + path)
+            except (IOError, OSError):
+                raise ValueError('missing manifest ' + path)
+            if package and package.name not in packages:
+                packages[package.name] = package
+        # the directories where the packages may be added or removed
+        for dirpath, listing in data['dirs']:
+            if get_listing(dirpath) != listing:
+                raise ValueError('modified directory ' + dirpath)
+        for (package_path, ext), type_names in data['interfaces'].items():
+            if list_interfaces(package_path, ext) != type_names:
+                raise ValueError('modified interfaces in ' +
+                                 os.path.join(package_path, ext))
+        self.packages = packages
+        self.interfaces = data['interfaces']
+        self.parsed = data['parsed']
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+u"""
+    sphinxcontrib.ros.inventory
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Binary inventory of the ROS objects to link between the projects.
+
+    The inventory is a sorted table looked up by binary search on a
+    memory map, so that many of them can be used without loading them::
+
+       magic    b'ROSINV1\\n'
+       count    uint32
+       offsets  uint32 * count, of the records sorted by the keys
+       records  b'objtype\\tname\\turi\\n'
+
+    :copyright: Copyright 2015 by Tamaki Nishino.
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+import mmap
+import os
+import struct
+import tempfile
+
+from .base import log_info
+
+INVENTORY_FILENAME = 'objects.rosinv'
+MAGIC = b'ROSINV1\n'
+HEADER = struct.Struct('<I')
+OFFSET = struct.Struct('<I')
+
+
+def make_key(objtype, name):
+    return (objtype + u'\t' + name).encode('utf-8')
+
+
+def write_inventory(filename, entries):
+    u"""Write the inventory of the entries, (objtype, name, uri)
+    """
+    records = sorted(make_key(objtype, name) + b'\t' +
+                     uri.encode('utf-8') + b'\n'
+                     for objtype, name, uri in entries)
+    offset = len(MAGIC) + HEADER.size + OFFSET.size * len(records)
+    offsets = []
+    for record in records:
+        offsets.append(OFFSET.pack(offset))
+        offset += len(record)
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(dir=dirname)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(MAGIC)
+        f.write(HEADER.pack(len(records)))
+        f.write(b''.join(offsets))
+        f.write(b''.join(records))
+    os.rename(tmp_path, filename)
+
+
+class ROSInventory(object):
+    u"""Inventory written by :func:`write_inventory`, mapped in memory.
+
+    Raises ValueError if the file is not an inventory.
+    """
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('not a ROS inventory: ' + filename)
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = HEADER.unpack_from(self.data, len(MAGIC))[0]
+        self.offsets = len(MAGIC) + HEADER.size
+
+    def get_record(self, index):
+        start = OFFSET.unpack_from(self.data,
+                                   self.offsets + OFFSET.size * index)[0]
+        return self.data[start:self.data.find(b'\n', start)]
+
+    def lookup(self, objtype, name):
+        u"""Get the URI of the object, or None if not found
+        """
+        key = make_key(objtype, name).split(b'\t')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record = self.get_record(middle).split(b'\t', 2)
+            if record[:2] == key:
+                return record[2].decode('utf-8')
+            if record[:2] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def close(self):
+        self.data.close()
+
+
+def write_ros_inventory(app, exception):
+    u"""Write the inventory of the objects in the output directory of the
+    HTML builders
+    """
+    if exception is not None or app.builder.format != 'html' or \
+            not hasattr(app.builder, 'get_target_uri'):
+        return
+    domain = app.env.get_domain('ros')
+    write_inventory(
+        os.path.join(app.outdir, INVENTORY_FILENAME),
+        [(objtype, name, app.builder.get_target_uri(docname) + '#' + anchor)
+         for name, _, objtype, docname, anchor, _ in domain.get_objects()])
+
+
+def open_inventories(app):
+    u"""Open the inventories of ``ros_inventories``
+
+    Returns the list of (project name, base URI, inventory). The
+    inventories which cannot be opened are skipped.
+    """
+    inventories = []
+    for project, (base_uri, filename) in \
+            sorted(app.config.ros_inventories.items()):
+        if filename is None:
+            filename = os.path.join(base_uri, INVENTORY_FILENAME)
+        filename = os.path.join(app.confdir, filename)
+        try:
+            inventory = ROSInventory(filename)
+        except (IOError, OSError, ValueError) as e:
+            log_info(app, 'ros inventory of {0} is not used: {1}'.format(
+                project, e))
+            continue
+        if base_uri and not base_uri.endswith('/'):
+            base_uri += '/'
+        inventories.append((project, base_uri, inventory))
+    return inventories
@@ -13,19 +13,32 @@ from __future__ import print_function
 import os
 import codecs
 import re
+import bisect
+from collections import namedtuple
+import pygments
+import sphinx
+from sphinx import addnodes
 from sphinx.locale import l_
 from docutils import nodes
 from docutils.statemachine import StringList
-from docutils.parsers.rst import directives
-from sphinx.util.docfields import TypedField, GroupedField
+from docutils.parsers.rst import Directive, directives
+from sphinx.util.docfields import Field, TypedField, GroupedField
 
 from pygments.lexer import RegexLexer, include, bygroups
 from pygments.token import (Punctuation, Literal,
                             Text, Comment, Operator, Name, Number, Keyword)
 
-from .base import ROSObjectDescription
-
-BUILTIN_TYPES = ('bool', 'byte',
+from .base import (ROSObjectDescription, find_package, log_info,
+                   format_docfields, has_fields)
+from .cache import ROSParseCache, make_key
+from .index import list_interfaces
+from .typegraph import ROSTypeGraph, get_text, compute_md5sum
+try:
+    intern
+except NameError:
+    from sys import intern
+
+BUILTIN_TYPES = ('bool', 'byte', 'char',
                  'int8', 'uint8', 'int16', 'uint16',
                  'int32', 'uint32', 'int64', 'uint64',
                  'float32', 'float64', 'string', 'time', 'duration', 'Header')
@@ -33,34 +46,6 @@ TYPE_SUFFIX = 'type'
 VALUE_SUFFIX = 'value'
 
 
-def split_blocks(strings):
-    u"""Split StringList into list of StringList
-    """
-    blocks = [StringList()]
-    for item in strings.xitems():  # (source, offset, value)
-        if item[2].strip():
-            blocks[-1].append(item[2], source=item[0], offset=item[1])
-        elif len(blocks[-1]):
-            blocks.append(StringList())
-    # remove the last block if empty
-    if len(blocks[-1]) == 0:
-        del blocks[-1]
-    return blocks
-
-
-def join_blocks(blocks):
-    u"""Join list of StringList to single StringList
-    """
-    strings = StringList()
-    for block in blocks:
-        strings.extend(block)
-        strings.extend(StringList([u'']))  # insert a blank line
-    # remove the last blank line
-    if strings and not strings[-1]:
-        del strings[-1]
-    return strings
-
-
 def align_strings(strings, header=''):
     u"""Align StringList
 
@@ -73,96 +58,257 @@ def align_strings(strings, header=''):
             strings.data[index] = header + strings.data[index][min_spaces:]
 
 
-class ROSField(object):
-    u"""A field or constant in a message file with comments
+def get_field_comment_option(options):
+    u"""Get the words of the ``field-comment`` option
     """
-    matcher = re.compile(r'([\w/]+)(\s*\[\s*\d*\s*\])?'
-                         '\s+(\w+)(\s*=\s*[^#]+)?(\s*)(#.*)?$')
-
-    def __init__(self, line, source=None, offset=0,
-                 pre_comments='', package_name=''):
-        self.source = source
-        self.offset = offset
-        result = self.matcher.match(line)
-        if result is None:
-            self.name = None
-            return
-        self.name = result.group(3)
-        self.type = result.group(1)
-        self.size = result.group(2).replace(' ', '') if result.group(2) else ''
-        self.value = result.group(4).lstrip()[1:] if result.group(4) else ''
-        comment = result.group(6) if result.group(6) else ''
-        if self.type == 'string' and self.value:
-            self.value += result.group(5) + comment
-            comment = ''
+    # not encoded, to be compared with str on Python 3
+    return options.get('field-comment', '').lower().split()
+
+
+FIELD = 'field'
+COMMENT = 'comment'
+SEPARATOR = 'separator'
+INVALID = 'invalid'
+
+LINE_MATCHER = re.compile(r"""
+    [^\S\n]*
+    (?:
+        (?P<type>[\w/]+)
+        (?P<size>[^\S\n]*\[[^\S\n]*\d*[^\S\n]*\])?
+        [^\S\n]+(?P<name>\w+)
+        (?P<value>[^\S\n]*=[^\S\n]*[^#\n]+)?
+        (?P<space>[^\S\n]*)(?P<field_comment>\#[^\n]*)?$
+      | \#(?P<comment>[^\n]*)
+      | (?P<separator>-+)[^\S\n]*$
+      | (?P<invalid>[^\n]*)
+    )
+    \n?
+""", re.VERBOSE | re.MULTILINE)
+
+
+def tokenize(file_content):
+    u"""Tokenize the lines of a message file in a single scan
+
+    Yields (kind, source, offset, match) for each line, where kind is one
+    of FIELD, COMMENT (including blank lines), SEPARATOR and INVALID.
+    """
+    text = u'\n'.join(file_content.data)
+    for (source, offset), match in zip(file_content.items,
+                                       LINE_MATCHER.finditer(text)):
+        if match.group('type') is not None:
+            kind = FIELD
+        elif match.group('comment') is not None:
+            kind = COMMENT
+        elif match.group('separator') is not None:
+            kind = SEPARATOR
+        elif match.group('invalid').rstrip():
+            kind = INVALID
         else:
-            self.value = self.value.strip()
-            comment = comment[1:]
-        if self.type not in BUILTIN_TYPES:
-            if '/' not in self.type:
-                # if the type is not builtin type and misses the package name
-                self.type = package_name + '/' + self.type
-        elif self.type == 'Header':
-            self.type = 'std_msgs/Header'
-        self.comment = StringList([comment], items=[(source, offset)])
-        self.pre_comments = pre_comments
-        self.post_comments = StringList()
+            kind = COMMENT  # blank line
+        yield kind, source, offset, match
+
+
+def make_comments(comments, start, end):
+    u"""Make StringList of the comment lines from start to end
+    """
+    comments = comments[start:end]
+    return StringList([text for source, offset, text in comments],
+                      items=[(source, offset)
+                             for source, offset, text in comments])
+
+
+def join_comment_blocks(comments, blocks, head=None, separate=True):
+    u"""Make StringList of the blocks of the comment lines
+
+    blocks are (start, end) of the comment lines and joined with blank
+    lines. If head is given, it is put before the first block, separated
+    by a blank line if separate is True.
+    """
+    data = []
+    items = []
+    if head is not None:
+        data.append(head[2])
+        items.append(head[:2])
+    for start, end in blocks:
+        if data and separate:
+            data.append(u'')
+            items.append((None, 0))
+        separate = True
+        for source, offset, text in comments[start:end]:
+            data.append(text)
+            items.append((source, offset))
+    return StringList(data, items=items)
+
+
+def find_blocks(comments, starts):
+    u"""Find the blocks of the comment lines
+
+    The blocks are separated by blank lines and by the fields, which are
+    inserted before the comment lines of the indices in starts.
+    Returns the list of (start, end) of the blocks.
+    """
+    blocks = []
+    bounds = set(starts)
+    start = None
+    for index, (source, offset, text) in enumerate(comments):
+        if start is not None and (index in bounds or not text.strip()):
+            blocks.append((start, index))
+            start = None
+        if start is None and text.strip():
+            start = index
+    if start is not None:
+        blocks.append((start, len(comments)))
+    return blocks
+
+
+class ROSField(namedtuple('ROSField', ('name', 'type', 'size', 'value',
+                                       'comment_text', 'source', 'offset',
+                                       'comments', 'blocks', 'pre_start',
+                                       'post_start', 'post_end',
+                                       'pre_block', 'post_block',
+                                       'end_block'))):
+    u"""A field or constant in a message file with comments
+
+    The comments are kept as the ranges of the comment lines and of the
+    comment blocks of the field group, and StringList of them are made
+    only when they are needed.
+    """
+    __slots__ = ()
+
+    @property
+    def comment(self):
+        return StringList([self.comment_text],
+                          items=[(self.source, self.offset)])
+
+    @property
+    def pre_comments(self):
+        return make_comments(self.comments, self.pre_start, self.post_start)
+
+    @property
+    def post_comments(self):
+        return make_comments(self.comments, self.post_start, self.post_end)
 
     def get_description(self, field_comment_option):
         u"""Get the description of the field
         """
-        desc = StringList()
-        pre_blocks = split_blocks(self.pre_comments)
-        post_blocks = split_blocks(self.comment + self.post_comments)
+        pre_blocks = self.blocks[self.pre_block:self.post_block]
+        post_blocks = self.blocks[self.post_block:self.end_block]
+        head = None
+        if self.comment_text.strip():
+            head = (self.source, self.offset, self.comment_text)
+        # the comment of the field continues to the next comment line
+        separate = not (post_blocks and post_blocks[0][0] == self.post_start)
         if 'up-all' in field_comment_option:
-            desc = join_blocks(pre_blocks)
+            return join_comment_blocks(self.comments, pre_blocks)
         elif 'up' in field_comment_option:
-            if pre_blocks:
-                desc = pre_blocks[-1]
+            return join_comment_blocks(self.comments, pre_blocks[-1:])
         elif 'right1' in field_comment_option:
-            desc = self.comment
+            return self.comment
         elif 'right-down' in field_comment_option:
-            if post_blocks:
-                desc = post_blocks[0]
+            if head is not None and separate:
+                post_blocks = ()
+            return join_comment_blocks(self.comments, post_blocks[:1],
+                                       head, separate)
         elif 'right-down-all' in field_comment_option:
-            if post_blocks:
-                desc = join_blocks(post_blocks)
-        return desc
+            return join_comment_blocks(self.comments, post_blocks,
+                                       head, separate)
+        return StringList()
 
 
 class ROSFieldGroup(object):
     u"""A group of fields and constants.
+
+    The comment lines and the invalid lines are stored as (source, offset,
+    text) and the fields and the comment blocks are made when the group is
+    closed.
     """
+    __slots__ = ('package_name', 'comments', 'blocks', 'fields',
+                 'pending_fields', 'invalid_lines')
+
     def __init__(self, package_name):
         self.package_name = package_name
-        self.description = StringList()
+        self.comments = []
+        self.blocks = ()
         self.fields = []
+        self.pending_fields = []
+        self.invalid_lines = []
 
-    def append(self, line, source, offset):
-        if line == '' or line[0] == '#':
-            if line:
-                line = line[1:]
-            if self.fields:
-                self.fields[-1].post_comments.append(line,
-                                                     source=source,
-                                                     offset=offset)
-            else:
-                self.description.append(line, source=source, offset=offset)
+    @property
+    def description(self):
+        end = self.fields[0].post_start if self.fields else None
+        return make_comments(self.comments, 0, end)
+
+    @property
+    def description_blocks(self):
+        u"""The comment blocks before the first field
+        """
+        end = self.fields[0].post_block if self.fields else None
+        return self.blocks[:end]
+
+    def append_comment(self, line, source, offset):
+        self.comments.append((source, offset, line))
+
+    def append_invalid(self, line, source, offset):
+        self.invalid_lines.append((source, offset, line))
+
+    def append_field(self, match, source, offset):
+        name = match.group('name')
+        field_type = match.group('type')
+        size = match.group('size')
+        size = size.replace(' ', '') if size else ''
+        value = match.group('value')
+        comment = match.group('field_comment')
+        # trailing spaces are matched by the last group
+        if comment:
+            comment = comment.rstrip()
+        elif value:
+            value = value.rstrip()
+        value = value.lstrip()[1:] if value else ''
+        comment = comment or ''
+        if field_type == 'string' and value:
+            value += match.group('space') + comment
+            comment = ''
         else:
-            if self.fields:
-                pre_comments = self.fields[-1].post_comments
-            else:
-                pre_comments = self.description
-            new_field = ROSField(line, source=source, offset=offset,
-                                 pre_comments=pre_comments,
-                                 package_name=self.package_name)
-            # if sucessfully parsed
-            if new_field.name:
-                self.fields.append(new_field)
-                self.pre_comments = StringList()
-            else:
-                # todo
-                print("?? <%s>" % line)
+            value = value.strip()
+            comment = comment[1:]
+        if field_type not in BUILTIN_TYPES:
+            if '/' not in field_type:
+                # if the type is not builtin type and misses the package name
+                field_type = self.package_name + '/' + field_type
+        elif field_type == 'Header':
+            field_type = 'std_msgs/Header'
+        self.pending_fields.append((intern(str(name)),
+                                    intern(str(field_type)),
+                                    size, value, comment, source, offset,
+                                    len(self.comments)))
+
+    def close(self):
+        u"""Freeze the comment lines and make the fields and the blocks
+        """
+        comments = tuple(self.comments)
+        starts = [field[-1] for field in self.pending_fields]
+        blocks = tuple(find_blocks(comments, starts))
+        block_starts = [start for start, end in blocks]
+        # index of the first block after each field
+        start_blocks = [bisect.bisect_left(block_starts, start)
+                        for start in starts]
+        ends = zip(starts[1:] + [len(comments)],
+                   start_blocks[1:] + [len(blocks)])
+        pre_start = pre_block = 0
+        fields = []
+        for field, post_block, (post_end, end_block) in zip(
+                self.pending_fields, start_blocks, ends):
+            fields.append(ROSField(*(field[:-1] + (
+                comments, blocks, pre_start, field[-1], post_end,
+                pre_block, post_block, end_block))))
+            pre_start = field[-1]
+            pre_block = post_block
+        self.comments = comments
+        self.blocks = blocks
+        self.fields = tuple(fields)
+        self.pending_fields = None
+        self.invalid_lines = tuple(self.invalid_lines)
+        return self
 
 
 class ROSFieldGroupType(object):
@@ -175,42 +321,42 @@ class ROSFieldGroupType(object):
         self.constant_name = constant_name
         self.constant_label = constant_label
 
-    def make_docfields(self, field_group, field_comment_option):
-        docfields = StringList([u''])
+    def get_docfields(self, field_group, field_comment_option):
+        u"""Get the docfields of the fields, see :func:`format_docfields`
+        """
+        docfields = []
         for field in field_group.fields:
             field_type = self.constant_name if field.value else self.field_name
             name = field.name + field.size
             desc = field.get_description(field_comment_option)
-            if len(desc) == 0:
-                docfields.append(u':{0} {1}:'.format(field_type, name),
-                                 source=field.source, offset=field.offset)
-            elif len(desc) == 1:
-                docfields.append(u':{0} {1}: {2}'.format(field_type,
-                                                         name,
-                                                         desc[0].strip()),
-                                 source=desc.source(0), offset=desc.offset(0))
+            if len(desc) == 1:
+                desc = StringList([desc[0].strip()], items=desc.items)
             elif len(desc) > 1:
                 if 'quote' in field_comment_option:
                     align_strings(desc, '  | ')
                 else:
                     align_strings(desc, '  ')
-                docfields.append(u':{0} {1}: {2}'.format(field_type,
-                                                         name, desc[0]),
-                                 source=desc.source(0), offset=desc.offset(0))
-                docfields.extend(desc[1:])
-            docfields.append(u':{0}-{1} {2}: {3}'.format(field_type,
-                                                         TYPE_SUFFIX,
-                                                         name,
-                                                         field.type),
-                             source=field.source, offset=field.offset)
+            docfields.append((u'{0} {1}'.format(field_type, name), desc,
+                              field.source, field.offset))
+            docfields.append((u'{0}-{1} {2}'.format(field_type, TYPE_SUFFIX,
+                                                    name),
+                              StringList([field.type],
+                                         items=[(field.source,
+                                                 field.offset)]),
+                              field.source, field.offset))
             if field.value:
-                docfields.append(u':{0}-{1} {2}: {3}'.format(field_type,
-                                                             VALUE_SUFFIX,
-                                                             name,
-                                                             field.value),
-                                 source=field.source, offset=field.offset)
+                docfields.append((u'{0}-{1} {2}'.format(field_type,
+                                                        VALUE_SUFFIX, name),
+                                  StringList([field.value],
+                                             items=[(field.source,
+                                                     field.offset)]),
+                                  field.source, field.offset))
         return docfields
 
+    def make_docfields(self, field_group, field_comment_option):
+        return StringList([u'']) + format_docfields(
+            self.get_docfields(field_group, field_comment_option))
+
     def get_doc_field_types(self):
         return [
             TypedField(self.field_name,
@@ -238,16 +384,30 @@ class ROSFieldGroupType(object):
 
 
 class ROSTypeFile(object):
-    def __init__(self, ext=None, field_group_types=None):
+    u"""A specification of the type files.
+
+    md5sum_types is the list of (field name, label, indices of the field
+    groups) of the MD5 sums of ROS1 computed from the field groups.
+    """
+    # file path -> file content, or None if not found, read in advance
+    prefetched = {}
+
+    def __init__(self, ext=None, field_group_types=None, md5sum_types=None):
         if field_group_types is None:
             field_group_types = []
+        if md5sum_types is None:
+            md5sum_types = []
         self.ext = ext
         self.field_group_types = field_group_types
+        self.md5sum_types = md5sum_types
 
     def get_doc_field_types(self):
         return [doc_field_type
                 for field_group_type in self.field_group_types
-                for doc_field_type in field_group_type.get_doc_field_types()]
+                for doc_field_type in field_group_type.get_doc_field_types()
+                ] + [Field(name, label=l_(label), has_arg=False,
+                           names=(name,))
+                     for name, label, indices in self.md5sum_types]
 
     def get_doc_merge_fields(self):
         doc_merge_fields = {}
@@ -255,33 +415,58 @@ class ROSTypeFile(object):
             doc_merge_fields.update(field_group_type.get_doc_merge_fields())
         return doc_merge_fields
 
+    def list_types(self, package_path):
+        u"""List the types defined in the package
+        """
+        return list_interfaces(package_path, self.ext)
+
     def read(self, package_path, ros_type):
         type_file = os.path.join(package_path,
                                  self.ext,
                                  ros_type+'.'+self.ext)
-        if not os.path.exists(type_file):
+        if type_file in ROSTypeFile.prefetched:
+            return type_file, ROSTypeFile.prefetched[type_file]
+        try:
+            with codecs.open(type_file, 'r', 'utf-8') as f:
+                raw_content = f.read()
+        except (IOError, OSError):
             file_content = None
         else:
-            raw_content = codecs.open(type_file, 'r', 'utf-8').read()
             file_content = StringList(raw_content.splitlines(),
                                       source=type_file)
         return type_file, file_content
 
     def parse(self, file_content, package_name):
-        u"""
+        u"""Parse the file content into the field groups
         """
         field_groups = []
         field_group = ROSFieldGroup(package_name)
-        for item in file_content.xitems():  # (source, offset, value)
-            line = item[2].strip()
-            if line and not [c for c in line if not c == '-']:
-                field_groups.append(field_group)
+        for kind, source, offset, match in tokenize(file_content):
+            if kind == FIELD:
+                field_group.append_field(match, source, offset)
+            elif kind == COMMENT:
+                field_group.append_comment(
+                    (match.group('comment') or u'').rstrip(), source, offset)
+            elif kind == SEPARATOR:
+                field_groups.append(field_group.close())
                 field_group = ROSFieldGroup(package_name)
             else:
-                field_group.append(line, item[0], item[1])
-        field_groups.append(field_group)
+                field_group.append_invalid(match.group('invalid').rstrip(),
+                                           source, offset)
+        field_groups.append(field_group.close())
         return field_groups
 
+    def report_invalid_lines(self, field_groups, reporter):
+        u"""Warn about the lines of the file which are not parsed
+
+        The lines are kept in the field groups to be reported even if the
+        field groups are taken from the parse cache.
+        """
+        for field_group in field_groups:
+            for source, offset, line in field_group.invalid_lines:
+                reporter.warning(u'invalid line in {0}: {1}'.format(
+                    self.ext, line), source=source, line=offset + 1)
+
     def make_docfields(self, field_groups, field_comment_option):
         docfields = StringList()
         for field_group_type, field_group in zip(self.field_group_types,
@@ -291,6 +476,211 @@ class ROSTypeFile(object):
                                                 field_comment_option))
         return docfields
 
+    def make_md5sums(self, field_groups, type_graph, env):
+        u"""Compute the MD5 sums of ROS1 of the field groups
+
+        The files of the types the fields depend on are noted as the
+        dependencies. Returns the list of (field name, MD5 sum) of the MD5
+        sums which can be computed.
+        """
+        md5sums = []
+        for name, label, indices in self.md5sum_types:
+            md5sum = compute_md5sum([
+                type_graph.get_md5_text(field_groups[index].fields)
+                for index in indices if index < len(field_groups)])
+            if md5sum is not None:
+                md5sums.append((name, md5sum))
+        for field_group in field_groups:
+            for depend in type_graph.get_all_depends(field_group.fields) or ():
+                env.note_dependency(os.path.relpath(
+                    type_graph.get_type(depend)[0], env.srcdir))
+        return md5sums
+
+    def get_docfields(self, file_content, field_groups, options,
+                      md5sums=()):
+        u"""Get the docfields of the fields and the MD5 sums
+        """
+        field_comment_option = get_field_comment_option(options)
+        docfields = []
+        for field_group_type, field_group in zip(self.field_group_types,
+                                                 field_groups):
+            docfields.extend(field_group_type.get_docfields(
+                field_group, field_comment_option))
+        source = file_content.source(0) if file_content else None
+        for name, md5sum in md5sums:
+            docfields.append((name, StringList([md5sum], items=[(source, 0)]),
+                              source, 0))
+        return docfields
+
+    def make_content(self, file_content, field_groups, options,
+                     user_content=None, md5sums=(), docfields=True):
+        u"""Make the directive content from the parsed file
+
+        The content consists of the fields, the MD5 sums, the description
+        and the user content according to the options. The fields and the
+        MD5 sums are left out if docfields is False.
+        """
+        # fields
+        content = StringList()
+        if docfields:
+            with ROSObjectDescription.profiler.measure('make_docfields'):
+                content = self.make_docfields(
+                    field_groups, get_field_comment_option(options))
+            for name, md5sum in md5sums:
+                content.append(u':{0}: {1}'.format(name, md5sum),
+                               source=file_content.source(0)
+                               if file_content else None, offset=0)
+
+        # description
+        if field_groups:
+            desc_blocks = field_groups[0].description_blocks
+            if desc_blocks:
+                description_option = [x.strip() for x in
+                                      options.get('description', '').
+                                      lower().split(',')]
+                first = second = None
+                for option in description_option:
+                    if not option:  # ignore empty option
+                        pass
+                    elif ':' in option:
+                        first, second = option.split(':', 1)
+                    elif option == 'quote':
+                        pass
+                    else:
+                        raise ValueError(
+                            "unkonwn option {0} in "
+                            "the description option".format(option))
+                blocks = desc_blocks[(int(first) if first else None):
+                                     (int(second) if second else None)]
+                if blocks:
+                    description = join_comment_blocks(
+                        field_groups[0].comments, blocks)
+                    if 'quote' in description_option:
+                        align_strings(description, '| ')
+                    else:
+                        align_strings(description)
+                    content = content + StringList([u'']) + description
+
+        if user_content is not None:
+            content = content + user_content
+        return content
+
+    def make_raw_block(self, file_content):
+        u"""Make the literal block of the raw file content
+        """
+        lines = file_content.data
+        start, end = 0, len(lines)
+        # blank lines at the both ends are not in the block
+        while start < end and not lines[start].strip():
+            start += 1
+        while end > start and not lines[end - 1].strip():
+            end -= 1
+        text = u'\n'.join(lines[start:end])
+        raw_block = ros_raw_block(text, text, language='rostype')
+        if start < end:
+            raw_block.source, raw_block.line = file_content.info(start)
+        return raw_block
+
+    def make_expanded_block(self, field_groups, depth, type_graph):
+        u"""Make the literal block of the fields with the nested types
+
+        Returns the block and the file paths of the expanded types.
+        """
+        lines = []
+        file_paths = set()
+        for index, field_group in enumerate(field_groups):
+            if index:
+                lines.append(u'---')
+            group_lines, group_file_paths = type_graph.expand(
+                field_group.fields, depth)
+            lines.extend(group_lines)
+            file_paths.update(group_file_paths)
+        text = u'\n'.join(lines)
+        return ros_raw_block(text, text, language='rostype'), file_paths
+
+    def make_raw_blocks(self, file_content, field_groups, options, env):
+        u"""Make the literal blocks of the ``expand`` and ``raw`` options
+
+        The ``definition`` option adds the full definition of a message.
+        Returns the list of (block, 'head' or 'tail').
+        """
+        raw_blocks = []
+        if 'expand' in options:
+            expanded_block, file_paths = self.make_expanded_block(
+                field_groups, options['expand'], ROSAutoType.type_graph)
+            for file_path in file_paths:
+                env.note_dependency(os.path.relpath(file_path, env.srcdir))
+            raw_blocks.append((expanded_block, 'tail'))
+        if 'definition' in options and self.ext == 'msg':
+            full_text = ROSAutoType.type_graph.get_full_text(
+                get_text(file_content),
+                [field for field_group in field_groups
+                 for field in field_group.fields])
+            if full_text is not None:
+                raw_blocks.append((ros_raw_block(full_text, full_text,
+                                                 language='none'), 'tail'))
+        if 'raw' in options:
+            raw_blocks.append((self.make_raw_block(file_content),
+                               options['raw']))
+        return raw_blocks
+
+
+class ros_raw_block(nodes.literal_block):
+    u"""Literal block of a type definition, highlighted through the cache
+    """
+
+
+def insert_raw_block(desc, raw_block, raw_option):
+    u"""Insert the raw block at the head or the tail of the description
+    """
+    contentnode = desc[-1]
+    if raw_option == 'head':
+        contentnode.insert(0, raw_block)
+    else:
+        contentnode.append(raw_block)
+
+
+def visit_raw_block(self, node):
+    self.visit_literal_block(node)
+
+
+def depart_raw_block(self, node):
+    self.depart_literal_block(node)
+
+
+def visit_raw_block_html(self, node):
+    u"""Visit the raw block with the HTML in the cache
+
+    The HTML is made by visit_literal_block of the running Sphinx and
+    cached as a whole, so that the markup is the same as without the cache.
+    """
+    highlight_cache = ROSAutoType.highlight_cache
+    if highlight_cache is None:
+        return self.visit_literal_block(node)
+    key = make_key(pygments.__version__, sphinx.__version__,
+                   str(ROSTypeLexer.version),
+                   repr(sorted(node.attributes.items())), node.rawsource)
+    highlighted = highlight_cache.get(key)
+    if highlighted is None:
+        start = len(self.body)
+        try:
+            self.visit_literal_block(node)
+        except nodes.SkipNode:
+            highlight_cache.set(key, u''.join(self.body[start:]))
+            raise
+        # not highlighted, the children are visited and the node departed
+        return
+    self.body.append(highlighted)
+    raise nodes.SkipNode
+
+
+def depth_option(argument):
+    u"""Depth of the expansion of the nested types, None for no limit
+    """
+    if argument is None or not argument.strip():
+        return None
+    return directives.nonnegative_int(argument)
+
 
 class ROSType(ROSObjectDescription):
     has_arguments = True
@@ -299,18 +689,31 @@ class ROSType(ROSObjectDescription):
         'noindex': directives.flag,
     }
 
+    def update_content(self):
+        # the docfields of the types of autointerfaces
+        docfields = self.env.temp_data.get('ros:docfields', {}).pop(
+            (self.objtype, self.arguments[0].strip()), None)
+        if docfields is not None:
+            self.docfields = docfields
+        return self.content
+
     def merge_field(self, src_node, dest_node):
         dest_node.insert(4, nodes.Text(':'))
         dest_node.insert(5, nodes.literal('', src_node[2].astext()))
 
 
 class ROSAutoType(ROSType):
+    parse_cache = None
+    highlight_cache = None
+    type_graph = None
     option_spec = {
         'noindex': directives.flag,
         'base': directives.path,
         'description': directives.unchanged,
         'raw': lambda x: directives.choice(x, ('head', 'tail')),
         'field-comment': directives.unchanged,
+        'expand': depth_option,
+        'definition': directives.flag,
     }
 
     def update_content(self):
@@ -318,9 +721,10 @@ class ROSAutoType(ROSType):
         package = self.find_package(package_name)
         if not package:
             return
-        file_path, file_content \
-            = self.type_file.read(os.path.dirname(package.filename),
-                                  type_name)
+        with self.profiler.measure('read'):
+            file_path, file_content \
+                = self.type_file.read(os.path.dirname(package.filename),
+                                      type_name)
         if file_content is None:
             self.state_machine.reporter.warning(
                 'cannot find file {0}'.format(file_path),
@@ -329,61 +733,91 @@ class ROSAutoType(ROSType):
         type_relfile = os.path.relpath(file_path, self.env.srcdir)
         self.env.note_dependency(type_relfile)
 
-        field_groups = self.type_file.parse(file_content, package_name)
-
-        # fields
-        options = self.options.get('field-comment', '')
-        field_comment_option = options.encode('ascii').lower().split()
-        content = self.type_file.make_docfields(field_groups,
-                                                field_comment_option)
-
-        # description
-        if field_groups:
-            desc = field_groups[0].description
-            desc_blocks = split_blocks(desc)
-            if desc_blocks:
-                description_option = [x.strip() for x in
-                                      self.options.get('description', '').
-                                      lower().split(',')]
-                first = second = None
-                for option in description_option:
-                    if not option:  # ignore empty option
-                        pass
-                    elif ':' in option:
-                        first, second = option.split(':', 1)
-                    elif option == 'quote':
-                        pass
-                    else:
-                        raise ValueError(
-                            "unkonwn option {0} in "
-                            "the description option".format(option))
-                blocks = desc_blocks[(int(first) if first else None):
-                                     (int(second) if second else None)]
-                if blocks:
-                    description = join_blocks(blocks)
-                    if 'quote' in description_option:
-                        align_strings(description, '| ')
-                    else:
-                        align_strings(description)
-                    content = content + StringList([u'']) + description
-
-        content = content + self.content
-        # raw file content
-        raw_option = self.options.get('raw', None)
-        #
-        if raw_option is not None:
-            code_block = StringList([u'', u'.. code-block:: rostype', u''])
-            code_block.extend(StringList(['    '+l for l in file_content.data],
-                                         items=file_content.items))
-            if raw_option == 'head':
-                content = code_block + StringList([u'']) + content
-            elif raw_option == 'tail':
-                content = content + code_block
-        return content
+        with self.profiler.measure('parse'):
+            field_groups = ROSAutoType.parse_cache.parse(self.type_file,
+                                                         file_path,
+                                                         file_content,
+                                                         package_name)
+        self.type_file.report_invalid_lines(field_groups,
+                                            self.state_machine.reporter)
+
+        self.raw_blocks = self.type_file.make_raw_blocks(
+            file_content, field_groups, self.options, self.env)
+        self.md5sums = self.type_file.make_md5sums(
+            field_groups, ROSAutoType.type_graph, self.env)
+        # the fields are made into the nodes unless the user content adds
+        # fields to be merged with them
+        docfields = not self.env.config.ros_docfield_nodes or \
+            has_fields(self.content)
+        if not docfields:
+            with self.profiler.measure('make_docfields'):
+                self.docfields = self.type_file.get_docfields(
+                    file_content, field_groups, self.options, self.md5sums)
+        return self.type_file.make_content(file_content, field_groups,
+                                           self.options, self.content,
+                                           self.md5sums, docfields)
 
     def run(self):
         self.name = self.name.replace('auto', '')
-        return ROSType.run(self)
+        self.raw_blocks = []
+        self.md5sums = []
+        node = ROSType.run(self)
+        for raw_block, raw_option in self.raw_blocks:
+            insert_raw_block(node[1], raw_block, raw_option)
+        if self.md5sums and 'noindex' not in self.options:
+            self.env.get_domain('ros').note_md5sums(
+                self.objtype, self.names[0], self.md5sums)
+        return node
+
+
+def init_parse_cache(app):
+    u"""Create the parse and highlight caches shared by the builds in
+    ``ros_cache_dir``.
+    """
+    cache_dir = app.config.ros_cache_dir
+    if cache_dir is None:
+        cache_dir = os.path.join(app.doctreedir, 'ros_cache')
+    elif not os.path.isabs(cache_dir):
+        cache_dir = os.path.join(app.confdir, cache_dir)
+    ROSAutoType.parse_cache = ROSParseCache(os.path.join(cache_dir, 'parse'))
+    # the parsed files of ``ros_prebuilt_index``
+    ROSAutoType.parse_cache.preload(
+        ROSObjectDescription.package_index.parsed)
+    ROSAutoType.highlight_cache = ROSParseCache(
+        os.path.join(cache_dir, 'highlight'))
+
+
+def find_message_type(type_name):
+    u"""Find and parse the message type in ``ros_base_path``
+
+    Returns (file path, file content, field groups), or None if not found.
+    """
+    package_name, name = type_name.split('/', 1)
+    package = ROSObjectDescription.package_index.get(package_name)
+    if not package:
+        return None
+    type_file = ROSMessageBase.type_file
+    file_path, file_content = type_file.read(
+        os.path.dirname(package.filename), name)
+    if file_content is None:
+        return None
+    return file_path, file_content, ROSAutoType.parse_cache.parse(
+        type_file, file_path, file_content, package_name)
+
+
+def init_type_graph(app):
+    u"""Create the graph of the message types shared by the directives.
+    """
+    ROSAutoType.type_graph = ROSTypeGraph(find_message_type)
+
+
+def report_parse_cache(app, exception):
+    u"""Report the hits and misses of the parse and highlight caches.
+    """
+    if ROSAutoType.parse_cache is not None:
+        log_info(app, ROSAutoType.parse_cache.summary())
+    if ROSAutoType.highlight_cache is not None:
+        log_info(app, ROSAutoType.highlight_cache.summary('highlight'))
 
 
 class ROSMessageBase(object):
@@ -394,7 +828,8 @@ class ROSMessageBase(object):
                               field_label='Field',
                               constant_name='constant',
                               constant_label='Constant'),
-        ])
+        ],
+        md5sum_types=[('md5sum', 'MD5 Sum', (0,))])
 
     doc_field_types = type_file.get_doc_field_types()
     doc_merge_fields = type_file.get_doc_merge_fields()
@@ -420,7 +855,8 @@ class ROSServiceBase(object):
                               field_label='Field (Response)',
                               constant_name='res-constant',
                               constant_label='Constant (Response)')
-        ])
+        ],
+        md5sum_types=[('md5sum', 'MD5 Sum', (0, 1))])
 
     doc_field_types = type_file.get_doc_field_types()
     doc_merge_fields = type_file.get_doc_merge_fields()
@@ -450,7 +886,10 @@ class ROSActionBase(object):
                               field_label='Field (Feedback)',
                               constant_name='feedback-constant',
                               constant_label='Constant (Feedback)')
-        ])
+        ],
+        md5sum_types=[('goal-md5sum', 'MD5 Sum (Goal)', (0,)),
+                      ('result-md5sum', 'MD5 Sum (Result)', (1,)),
+                      ('feedback-md5sum', 'MD5 Sum (Feedback)', (2,))])
 
     doc_field_types = type_file.get_doc_field_types()
     doc_merge_fields = type_file.get_doc_merge_fields()
@@ -464,10 +903,116 @@ class ROSAutoAction(ROSActionBase, ROSAutoType):
     pass
 
 
+class ROSAutoInterfaces(Directive):
+    u"""Document all the messages, services and actions of a package.
+
+    The interface directories are listed once and the generated contents
+    of all the types are parsed at once.
+    """
+    required_arguments = 1
+    option_spec = {
+        'noindex': directives.flag,
+        'base': directives.path,
+        'types': lambda x: [directives.choice(ext, ('msg', 'srv', 'action'))
+                            for ext in x.split()],
+        'description': directives.unchanged,
+        'raw': lambda x: directives.choice(x, ('head', 'tail')),
+        'field-comment': directives.unchanged,
+        'expand': depth_option,
+        'definition': directives.flag,
+    }
+    interface_types = (
+        ('message', ROSMessageBase.type_file),
+        ('service', ROSServiceBase.type_file),
+        ('action', ROSActionBase.type_file),
+    )
+
+    def run(self):
+        profiler = ROSObjectDescription.profiler
+        with profiler.measure('run', 'autointerfaces', self.arguments[0]):
+            return self.make_interfaces(profiler)
+
+    def make_interfaces(self, profiler):
+        env = self.state.document.settings.env
+        package_name = self.arguments[0]
+        with profiler.measure('find_package'):
+            package = find_package(env, package_name,
+                                   self.options.get('base'))
+        if not package:
+            self.state_machine.reporter.warning(
+                'cannot find package %s' % package_name,
+                line=self.lineno)
+            return []
+        package_path = os.path.dirname(package.filename)
+        types = self.options.get('types', ('msg', 'srv', 'action'))
+        source, line = self.state_machine.get_source_and_line(self.lineno)
+        content = StringList()
+        raw_blocks = []
+        for objtype, type_file in self.interface_types:
+            if type_file.ext not in types:
+                continue
+            for type_name in ROSObjectDescription.package_index.\
+                    get_interfaces(package_path, type_file.ext):
+                with profiler.measure('read'):
+                    file_path, file_content = type_file.read(package_path,
+                                                             type_name)
+                env.note_dependency(os.path.relpath(file_path, env.srcdir))
+                with profiler.measure('parse'):
+                    field_groups = ROSAutoType.parse_cache.parse(
+                        type_file, file_path, file_content, package_name)
+                type_file.report_invalid_lines(field_groups,
+                                               self.state_machine.reporter)
+                md5sums = type_file.make_md5sums(
+                    field_groups, ROSAutoType.type_graph, env)
+                if md5sums and 'noindex' not in self.options:
+                    env.get_domain('ros').note_md5sums(
+                        objtype, package_name + '/' + type_name, md5sums)
+                # the docfields are passed to the directive of the type
+                docfields = not env.config.ros_docfield_nodes
+                if not docfields:
+                    with profiler.measure('make_docfields'):
+                        env.temp_data.setdefault('ros:docfields', {})[
+                            (objtype, package_name + '/' + type_name)] = \
+                            type_file.get_docfields(file_content,
+                                                    field_groups,
+                                                    self.options, md5sums)
+                type_content = type_file.make_content(file_content,
+                                                      field_groups,
+                                                      self.options,
+                                                      md5sums=md5sums,
+                                                      docfields=docfields)
+                raw_blocks.append(type_file.make_raw_blocks(
+                    file_content, field_groups, self.options, env))
+                content.append(u'.. ros:{0}:: {1}/{2}'.format(objtype,
+                                                              package_name,
+                                                              type_name),
+                               source=source, offset=line - 1)
+                if 'noindex' in self.options:
+                    content.append(u'   :noindex:',
+                                   source=source, offset=line - 1)
+                content.append(u'', source=source, offset=line - 1)
+                content.extend(StringList([u'   ' + l
+                                           for l in type_content.data],
+                                          items=type_content.items))
+                content.append(u'', source=source, offset=line - 1)
+        node = nodes.Element()
+        with profiler.measure('nested_parse'):
+            self.state.nested_parse(content, 0, node)
+        # each type is described in a desc node in order
+        descs = [child for child in node.children
+                 if isinstance(child, addnodes.desc)]
+        for desc, type_raw_blocks in zip(descs, raw_blocks):
+            for raw_block, raw_option in type_raw_blocks:
+                insert_raw_block(desc, raw_block, raw_option)
+        return node.children
+
+
 class ROSTypeLexer(RegexLexer):
     name = 'ROSTYPE'
     aliases = ['rostype']
     filenames = ['*.msg', '*.srv', '*.action']
+    # version of the tokens for the highlight cache
+    version = 1
 
     tokens = {
         'common': [
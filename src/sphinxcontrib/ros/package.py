@@ -10,16 +10,22 @@ u"""
 """
 from __future__ import print_function
 
-from docutils.parsers.rst import directives
+import os
+
+from docutils import nodes
+from docutils.parsers.rst import Directive, directives
 from docutils.statemachine import StringList
-from sphinx.locale import l_
+from sphinx.ext.graphviz import graphviz
+from sphinx.locale import _, l_
 from sphinx.util.docfields import Field
 try:
     unicode
 except:
     def unicode(s): return str(s)
 
-from .base import ROSObjectDescription, GroupedFieldNoArg
+from .base import (ROSObjectDescription, GroupedFieldNoArg, format_docfields,
+                   has_fields, get_packages)
+from .dependgraph import ROSDependGraph, kinds_option
 
 
 def default_formatter(value):
@@ -62,33 +68,84 @@ FORMATTERS = {
 }
 
 
+DEPEND_ATTRS = ('build_depends', 'buildtool_depends', 'build_export_depends',
+                'buildtool_export_depends', 'exec_depends', 'run_depends',
+                'test_depends', 'doc_depends')
+
+
 def add_formatter(formatter_name, formatter):
     global FORMATTERS
     FORMATTERS[formatter_name] = formatter
 
 
-def format_attr(package, attr, formatter_name='default_formatter'):
+def get_attr_docfields(package, attr, formatter_name='default_formatter'):
+    u"""Get the docfields of the attribute, see :func:`format_docfields`
+    """
     value = getattr(package, attr, None)
     field_name = attr if not attr.endswith('s') else attr[:-1]
-    field_header = u':' + field_name + ':'
     formatter = FORMATTERS[formatter_name]
-    field_content = []
+    docfields = []
     if value:
-        if attr.endswith('s'):
-            for v in value:
-                field_content.append(field_header)
-                field_content.extend(['   '+line for line in formatter(v)])
-        else:
-            field_content.append(field_header)
-            field_content.extend(['   '+line for line in formatter(value)])
-        return StringList(field_content)
+        for v in (value if attr.endswith('s') else [value]):
+            lines = StringList([u''] + ['   '+line for line in formatter(v)])
+            lines.items = [(None, 0)] * len(lines)
+            docfields.append((field_name, lines, None, 0))
+    return docfields
+
+
+def format_attr(package, attr, formatter_name='default_formatter'):
+    docfields = get_attr_docfields(package, attr, formatter_name)
+    if docfields:
+        return format_docfields(docfields)
+
+
+def note_depends(env, names, kinds):
+    u"""Note the manifests of the packages and of all their dependencies
+    as the dependencies of the document
+    """
+    depend_graph = ROSPackage.depend_graph
+    packages = set(names)
+    for name in names:
+        packages.update(depend_graph.get_closure(name, kinds))
+    for name in sorted(packages):
+        package = depend_graph.find_package(name)
+        if package:
+            env.note_dependency(os.path.relpath(package.filename,
+                                                env.srcdir))
+
+
+def make_depend_graph(directive, names, kinds):
+    u"""Make the graphviz node of the dependencies of the packages
+
+    The graph is rendered only if ``sphinx.ext.graphviz`` is loaded, by
+    the project or by another extension, otherwise its source is shown
+    instead.
+    """
+    env = directive.state.document.settings.env
+    note_depends(env, names, kinds)
+    code = ROSPackage.depend_graph.get_dot(names, kinds)
+    if 'sphinx.ext.graphviz' not in env.app.extensions:
+        directive.state_machine.reporter.warning(
+            'add sphinx.ext.graphviz to extensions to render the graph',
+            line=directive.lineno)
+        return nodes.literal_block(code, code)
+    node = graphviz()
+    node['code'] = code
+    # the image is named by the hash of the code and the options, so the
+    # graph is rendered once while it is unchanged, even in other documents
+    node['options'] = {}
+    node['alt'] = _('dependencies of %s') % ', '.join(names)
+    return node
 
 
 # http://www.ros.org/reps/rep-0127.html
 class ROSPackage(ROSObjectDescription):
     option_spec = {
         'noindex': directives.flag,
+        'depend-graph': kinds_option,
+        'depend-depth': kinds_option,
     }
+    depend_graph = None
     package_attrs = (
         'version',
         'description',
@@ -117,11 +174,42 @@ class ROSPackage(ROSObjectDescription):
         for attr in package_attrs
     ]
 
+    def make_depends(self, contentnode):
+        u"""Add the depth and the graph of the dependencies if asked
+        """
+        name = self.arguments[0].strip()
+        if 'depend-depth' in self.options:
+            kinds = self.options['depend-depth']
+            note_depends(self.env, [name], kinds)
+            text = _('%d (%d packages)') % (
+                self.depend_graph.get_depth(name, kinds),
+                len(self.depend_graph.get_closure(name, kinds)))
+            field = nodes.field('', nodes.field_name('', _('Depend Depth')),
+                                nodes.field_body('', nodes.paragraph(text,
+                                                                     text)))
+            for child in contentnode:
+                if isinstance(child, nodes.field_list):
+                    child += field
+                    break
+            else:
+                contentnode.insert(0, nodes.field_list('', field))
+        if 'depend-graph' in self.options:
+            contentnode += make_depend_graph(self, [name],
+                                             self.options['depend-graph'])
+
+    def run(self):
+        node = ROSObjectDescription.run(self)
+        with self.profiler.measure('make_depends'):
+            self.make_depends(node[1][-1])
+        return node
+
 
 class ROSAutoPackage(ROSPackage):
     option_spec = {
         'noindex': directives.flag,
         'base': directives.path,
+        'depend-graph': kinds_option,
+        'depend-depth': kinds_option,
     }
     attr_formatters = {
         'description': 'description_formatter',
@@ -137,8 +225,12 @@ class ROSAutoPackage(ROSPackage):
         package = self.find_package(package_name)
         if not package:
             return None
-        self.env.note_dependency(self.env.relfn2path(package.filename)[0])
-        content = StringList()
+        self.env.note_dependency(os.path.relpath(package.filename,
+                                                 self.env.srcdir))
+        self.depends = set(depend.name
+                           for attr in DEPEND_ATTRS
+                           for depend in getattr(package, attr, None) or ())
+        docfields = []
         for attr in self.env.config.ros_package_attrs:
             if attr in self.env.config.ros_package_attrs_formatter:
                 formatter = self.env.config.ros_package_attrs_formatter[attr]
@@ -146,14 +238,79 @@ class ROSAutoPackage(ROSPackage):
                 formatter = 'depend_formatter'
             else:
                 formatter = self.attr_formatters.get(attr, 'default_formatter')
-            field = format_attr(package, attr, formatter)
-            if field:
-                content.extend(field)
-        content.items = [(source, 0) for source, line in content.items]
+            docfields.extend(get_attr_docfields(package, attr, formatter))
+        # the fields are made into the nodes unless the user content adds
+        # fields to be merged with them
+        if self.env.config.ros_docfield_nodes and \
+                not has_fields(self.content):
+            self.docfields = docfields
+            return self.content
+        content = format_docfields(docfields)
         if len(content) > 0:
             content.append(StringList([u'']))
         return content + self.content
 
+    def get_references(self, contentnode):
+        # the dependencies in the manifest even if they are not shown
+        return ROSPackage.get_references(self, contentnode) | \
+            set(('pkg', depend) for depend in self.depends)
+
     def run(self):
         self.name = self.name.replace('auto', '')
+        self.depends = set()
         return ROSPackage.run(self)
+
+
+class ROSPackageGraph(Directive):
+    u"""Show the dependencies of the packages, or of all the packages in
+    ``ros_base_path``, as a graph or as a table of their depths.
+    """
+    optional_arguments = 1
+    final_argument_whitespace = True
+    option_spec = {
+        'depends': kinds_option,
+        'depth': directives.flag,
+    }
+
+    def run(self):
+        env = self.state.document.settings.env
+        names = self.arguments[0].split() if self.arguments else \
+            sorted(get_packages(env))
+        kinds = self.options.get('depends', kinds_option(None))
+        profiler = ROSObjectDescription.profiler
+        with profiler.measure('run', 'packagegraph',
+                              self.arguments[0] if self.arguments else None):
+            if 'depth' not in self.options:
+                return [make_depend_graph(self, names, kinds)]
+            return self.make_depth_table(env, names, kinds)
+
+    def make_depth_table(self, env, names, kinds):
+        u"""Make the table of the packages sorted by their depths
+        """
+        note_depends(env, names, kinds)
+        depend_graph = ROSPackage.depend_graph
+        content = StringList([u'.. list-table::',
+                              u'   :header-rows: 1',
+                              u'',
+                              u'   * - ' + _('Package'),
+                              u'     - ' + _('Depth'),
+                              u'     - ' + _('Depends')])
+        for depth, name in sorted(
+                (-depend_graph.get_depth(name, kinds), name)
+                for name in names):
+            content.append(StringList([
+                u'   * - :ros:pkg:`{0}`'.format(name),
+                u'     - {0}'.format(-depth),
+                u'     - {0}'.format(len(
+                    depend_graph.get_closure(name, kinds)))]))
+        node = nodes.container()
+        self.state.nested_parse(content, 0, node)
+        return node.children
+
+
+def init_depend_graph(app):
+    u"""Create the graph of the package dependencies shared by the
+    directives.
+    """
+    package_index = ROSObjectDescription.package_index
+    ROSPackage.depend_graph = ROSDependGraph(package_index.get)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+u"""
+    sphinxcontrib.ros.prebuilt
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Command to prebuild the package index for ``ros_prebuilt_index``.
+
+    Usage::
+
+       $ sphinx-ros-index ../src /opt/ros/kinetic/share --srcdir doc \\
+             --output ros_index.pickle
+
+    :copyright: Copyright 2015 by Tamaki Nishino.
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import time
+
+from .base import resolve_base_paths
+from .cache import make_parse_key, compress
+from .index import ROSPackageIndex, PREBUILT_FILENAME
+from .message import ROSMessageBase, ROSServiceBase, ROSActionBase
+
+TYPE_FILES = (ROSMessageBase.type_file, ROSServiceBase.type_file,
+              ROSActionBase.type_file)
+
+
+def parse_interfaces(package_index):
+    u"""Parse the interface files of all the packages
+
+    Returns the compressed field groups by the parse cache key.
+    """
+    parsed = {}
+    for package in package_index.packages.values():
+        package_path = os.path.dirname(package.filename)
+        for type_file in TYPE_FILES:
+            for type_name in package_index.get_interfaces(package_path,
+                                                          type_file.ext):
+                file_path, file_content = type_file.read(package_path,
+                                                         type_name)
+                if file_content is None:
+                    continue
+                key = make_parse_key(type_file, file_path, file_content,
+                                     package.name)
+                parsed[key] = compress(type_file.parse(file_content,
+                                                       package.name))
+    return parsed
+
+
+def build_index(base_paths, filename, workers=1, exclude=()):
+    u"""Build the package index of the base paths and save it in filename
+
+    Returns the package index.
+    """
+    package_index = ROSPackageIndex(exclude=exclude)
+    package_index.update(base_paths, workers)
+    package_index.index_interfaces()
+    package_index.save_prebuilt(filename, base_paths,
+                                parse_interfaces(package_index))
+    return package_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Prebuild the package index of sphinxcontrib-ros.')
+    parser.add_argument('base_paths', nargs='+', metavar='base_path',
+                        help='same as ros_base_path')
+    parser.add_argument('--srcdir', default='.',
+                        help='source directory of the Sphinx project, '
+                        'which the relative base paths are relative to')
+    parser.add_argument('-o', '--output', default=PREBUILT_FILENAME)
+    parser.add_argument('-j', '--workers', type=int, default=4)
+    parser.add_argument('--exclude', action='append', default=[],
+                        metavar='PATTERN',
+                        help='same as ros_exclude_patterns')
+    args = parser.parse_args(argv)
+    start = time.time()
+    package_index = build_index(
+        resolve_base_paths(args.base_paths, os.path.abspath(args.srcdir)),
+        args.output, args.workers, args.exclude)
+    print('{0} directories visited, {1} pruned'.format(
+        *package_index.crawled))
+    print('{0} packages and {1} interfaces indexed in {2:.3f} s: {3} '
+          '({4} bytes)'.format(len(package_index.packages),
+                               sum(len(names) for names
+                                   in package_index.interfaces.values()),
+                               time.time() - start, args.output,
+                               os.path.getsize(args.output)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+u"""
+    sphinxcontrib.ros.prefetch
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Reading and parsing of the type files in advance by a thread pool, for
+    the workspaces on the networked filesystems.
+
+    :copyright: Copyright 2015 by Tamaki Nishino.
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+import codecs
+import os
+import re
+import time
+from multiprocessing.pool import ThreadPool
+
+from .base import ROSObjectDescription, get_packages, log_info
+from .message import (ROSTypeFile, ROSAutoType, ROSMessageBase,
+                      ROSServiceBase, ROSActionBase)
+from .typegraph import is_message_type
+
+TYPE_FILES = dict((type_file.ext, type_file)
+                  for type_file in (ROSMessageBase.type_file,
+                                    ROSServiceBase.type_file,
+                                    ROSActionBase.type_file))
+DIRECTIVE_EXTS = {
+    'message': ('msg',),
+    'service': ('srv',),
+    'action': ('action',),
+    'interfaces': ('msg', 'srv', 'action'),
+}
+AUTO_DIRECTIVE = re.compile(
+    r'^\s*\.\.\s+ros:auto(message|service|action|interfaces)::\s*(\S+)',
+    re.M)
+
+
+def find_targets(env, docnames):
+    u"""Find the targets of the ros:auto* directives of the documents
+
+    The targets are (package name, ext, type name), where the type name
+    is None for all the types of ext in the package.
+    """
+    targets = set()
+    for docname in docnames:
+        try:
+            with codecs.open(env.doc2path(docname), 'r', 'utf-8') as f:
+                source = f.read()
+        except (IOError, OSError):
+            continue
+        for directive, argument in AUTO_DIRECTIVE.findall(source):
+            if directive == 'interfaces':
+                package_name, type_name = argument, None
+            elif '/' in argument:
+                package_name, type_name = argument.split('/', 1)
+            else:
+                continue
+            targets.update((package_name, ext, type_name)
+                           for ext in DIRECTIVE_EXTS[directive])
+    return targets
+
+
+def find_all_targets(env):
+    u"""Get the targets of all the types of the indexed packages
+    """
+    return set((package_name, ext, None)
+               for package_name in get_packages(env)
+               for ext in TYPE_FILES)
+
+
+class ROSPrefetcher(object):
+    u"""Reader and parser of the type files by a thread pool.
+
+    The type files of the targets are read and parsed concurrently, then
+    the message types of their fields, and so on, so that the directives
+    and the type graph find them in memory. The times of the tasks are
+    summed up to report the I/O time hidden by the threads.
+    """
+    def __init__(self, workers):
+        self.workers = workers
+        self.files = {}  # file path -> file content or None
+        self.elapsed = 0.0  # sum of the times of the tasks
+
+    def get_package_path(self, package_name):
+        package = ROSObjectDescription.package_index.get(package_name)
+        return os.path.dirname(package.filename) if package else None
+
+    def list_types(self, target):
+        u"""Get the targets of the types, listing the interface directories
+        """
+        package_name, ext, type_name = target
+        if type_name is not None:
+            return [target], 0.0
+        start = time.time()
+        package_path = self.get_package_path(package_name)
+        type_names = ROSObjectDescription.package_index.get_interfaces(
+            package_path, ext) if package_path else []
+        return ([(package_name, ext, name) for name in type_names],
+                time.time() - start)
+
+    def fetch(self, target):
+        u"""Read and parse the type file of the target
+
+        Returns (file path, file content, field groups, elapsed time).
+        """
+        package_name, ext, type_name = target
+        start = time.time()
+        package_path = self.get_package_path(package_name)
+        if package_path is None:
+            return None, None, None, 0.0
+        type_file = TYPE_FILES[ext]
+        file_path, file_content = type_file.read(package_path, type_name)
+        field_groups = None
+        if file_content is not None:
+            field_groups = ROSAutoType.parse_cache.parse(
+                type_file, file_path, file_content, package_name)
+        return file_path, file_content, field_groups, time.time() - start
+
+    def prefetch(self, targets):
+        u"""Prefetch the type files of the targets and their dependencies
+        """
+        pool = ThreadPool(self.workers)
+        try:
+            listed = pool.map(self.list_types, sorted(
+                targets, key=lambda target: tuple(map(str, target))))
+            targets = set()
+            for types, elapsed in listed:
+                targets.update(types)
+                self.elapsed += elapsed
+            done = set()
+            while targets:
+                done.update(targets)
+                # keep all the parsed files in memory for the directives
+                ROSAutoType.parse_cache.reserve(len(done))
+                fetched = pool.map(self.fetch, sorted(targets))
+                targets = set()
+                for file_path, file_content, field_groups, elapsed \
+                        in fetched:
+                    self.elapsed += elapsed
+                    if file_path is None:
+                        continue
+                    self.files[file_path] = file_content
+                    for field_group in field_groups or ():
+                        for field in field_group.fields:
+                            if not field.value and \
+                                    is_message_type(field.type):
+                                package_name, type_name = \
+                                    field.type.split('/', 1)
+                                targets.add((package_name, 'msg',
+                                             type_name))
+                targets -= done
+        finally:
+            pool.close()
+            pool.join()
+        return self.files
+
+
+def prefetch_type_files(app, env, docnames):
+    u"""Read and parse the type files of the documents to be read, or of
+    all the packages, in advance if ``ros_prefetch`` is set.
+    """
+    ROSTypeFile.prefetched = {}
+    mode = app.config.ros_prefetch
+    if not mode:
+        return
+    start = time.time()
+    if mode == 'all':
+        targets = find_all_targets(env)
+    else:
+        targets = find_targets(env, docnames)
+    prefetcher = ROSPrefetcher(app.config.ros_prefetch_workers)
+    files = prefetcher.prefetch(targets)
+    ROSTypeFile.prefetched = files
+    elapsed = time.time() - start
+    log_info(app, 'ros prefetch: {0} files in {1:.3f} s by {2} threads, '
+             '{3:.3f} s of I/O hidden'.format(
+                 len(files), elapsed, prefetcher.workers,
+                 max(0.0, prefetcher.elapsed - elapsed)))
+
+
+def clear_prefetched(app, exception):
+    u"""Release the prefetched files, which may change before the next
+    build
+    """
+    ROSTypeFile.prefetched = {}
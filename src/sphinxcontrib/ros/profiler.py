@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+u"""
+    sphinxcontrib.ros.profiler
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Profiler of the directives and the cross references.
+
+    :copyright: Copyright 2015 by Tamaki Nishino.
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+import json
+import os
+import time
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+PROFILE_FILENAME = 'ros_profile.json'
+
+
+class NullMeasure(object):
+    u"""Measure doing nothing, used when the profiler is disabled
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_MEASURE = NullMeasure()
+
+
+class Measure(object):
+    def __init__(self, profiler, section, objtype, package):
+        self.profiler = profiler
+        self.args = (section, objtype, package)
+
+    def __enter__(self):
+        self.profiler.begin(*self.args)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.end()
+        return False
+
+
+class ROSProfiler(object):
+    u"""Profiler of the wall time, the calls and the peak allocations.
+
+    The measurements are aggregated by (section, objtype, package). The
+    objtype and the package of a nested measurement default to the ones
+    of the enclosing measurement. The peak allocations are traced with
+    tracemalloc if it can reset the peak.
+    A forked process starts with empty stats, to be merged into the ones
+    of the main process.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.trace_memory = (enabled and tracemalloc is not None and
+                             hasattr(tracemalloc, 'reset_peak'))
+        self.started_tracing = False
+        self.stats = {}  # (section, objtype, package) -> [calls, time, peak]
+        self.stack = []
+        self.main_pid = self.pid = os.getpid()
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def measure(self, section, objtype=None, package=None):
+        u"""Get a context manager to measure the section
+        """
+        if not self.enabled:
+            return NULL_MEASURE
+        return Measure(self, section, objtype, package)
+
+    def check_fork(self):
+        u"""Start with empty stats if the process has been forked
+        """
+        if self.pid != os.getpid():
+            self.stats = {}
+            self.pid = os.getpid()
+
+    def is_forked(self):
+        self.check_fork()
+        return self.pid != self.main_pid
+
+    def begin(self, section, objtype=None, package=None):
+        if not self.enabled:
+            return
+        self.check_fork()
+        if self.stack:
+            parent = self.stack[-1]
+            objtype = parent[1] if objtype is None else objtype
+            package = parent[2] if package is None else package
+        memory = peak = 0
+        if self.trace_memory and tracemalloc.is_tracing():
+            memory, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                self.stack[-1][4] = max(self.stack[-1][4], peak)
+            tracemalloc.reset_peak()
+            peak = memory
+        self.stack.append([section, objtype or '', package or '',
+                           memory, peak, time.time()])
+
+    def end(self):
+        if not self.enabled or not self.stack:
+            return
+        section, objtype, package, memory, peak, start \
+            = self.stack.pop()
+        elapsed = time.time() - start
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if self.stack:
+                self.stack[-1][4] = max(self.stack[-1][4], peak)
+            tracemalloc.reset_peak()
+        self.add((section, objtype, package), 1, elapsed, peak - memory)
+
+    def add(self, key, calls, elapsed, peak):
+        stat = self.stats.setdefault(key, [0, 0.0, 0])
+        stat[0] += calls
+        stat[1] += elapsed
+        stat[2] = max(stat[2], peak)
+
+    def merge(self, stats):
+        u"""Merge the stats of another profiler
+        """
+        for key, (calls, elapsed, peak) in stats.items():
+            self.add(key, calls, elapsed, peak)
+
+    def get_entries(self):
+        u"""Get the stats as the list of dict sorted by the time
+        """
+        return [{'section': section, 'objtype': objtype,
+                 'package': package, 'calls': calls, 'time': elapsed,
+                 'peak': peak}
+                for (section, objtype, package), (calls, elapsed, peak)
+                in sorted(self.stats.items(), key=lambda x: -x[1][1])]
+
+    def get_totals(self, field):
+        u"""Get the stats aggregated by field, objtype or package
+        """
+        totals = {}
+        for entry in self.get_entries():
+            section_totals = totals.setdefault(entry[field], {})
+            total = section_totals.setdefault(
+                entry['section'], {'calls': 0, 'time': 0.0, 'peak': 0})
+            total['calls'] += entry['calls']
+            total['time'] += entry['time']
+            total['peak'] = max(total['peak'], entry['peak'])
+        return totals
+
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            json.dump({'entries': self.get_entries(),
+                       'objtypes': self.get_totals('objtype'),
+                       'packages': self.get_totals('package')},
+                      f, indent=2, sort_keys=True)
+
+    def summary(self, top=10):
+        u"""Get the lines of the top entries of the time
+        """
+        lines = ['ros profile: top {0} of {1} entries'.format(
+            top, len(self.stats))]
+        for entry in self.get_entries()[:top]:
+            lines.append('{time:9.3f} s {calls:7d} calls {peak:10d} B  '
+                         '{section} {objtype} {package}'.format(**entry))
+        return lines
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+u"""
+    sphinxcontrib.ros.typegraph
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Graph of the message types embedded in the fields.
+
+    :copyright: Copyright 2015 by Tamaki Nishino.
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+import hashlib
+
+INDENT = u'  '
+SEPARATOR = u'=' * 80 + u'\n'
+
+
+def is_message_type(field_type):
+    u"""Check if the field type is a message type, not a builtin type
+    """
+    # the package name is added to all the message types by the parser
+    return '/' in field_type
+
+
+def unique(items):
+    found = set()
+    return [item for item in items
+            if not (item in found or found.add(item))]
+
+
+def format_field(field):
+    line = u'{0}{1} {2}'.format(field.type, field.size, field.name)
+    if field.value:
+        line += u'=' + field.value
+    return line
+
+
+class ROSTypeGraph(object):
+    u"""Build-wide graph of the message types.
+
+    find_type is called with a type name like ``geometry_msgs/Pose`` and
+    returns (file path, file content, field groups) of the type, or None
+    if not found. Each type is looked up only once, and the expansions,
+    the dependencies and the MD5 sums of the types are memoized, so that
+    they are computed bottom-up once for each type.
+    """
+    def __init__(self, find_type):
+        self.find_type = find_type
+        self.types = {}  # type name -> (file path, text, fields) or None
+        self.expansions = {}  # (type name, depth) -> (lines, file paths)
+        self.depends = {}  # type name -> all the dependencies or None
+        self.md5sums = {}  # type name -> MD5 sum or None
+
+    def get_type(self, type_name):
+        u"""Get (file path, text, fields) of the type, or None if not found
+        """
+        if type_name not in self.types:
+            found = self.find_type(type_name)
+            if found is not None:
+                file_path, file_content, field_groups = found
+                found = (file_path, get_text(file_content),
+                         tuple(field for field_group in field_groups
+                               for field in field_group.fields))
+            self.types[type_name] = found
+        return self.types[type_name]
+
+    def expand(self, fields, depth=None):
+        u"""Expand the message types of the fields recursively
+
+        The types are expanded up to depth levels, or fully if depth is
+        None. Returns the lines like ``rosmsg show`` and the set of the
+        file paths of the expanded types.
+        """
+        lines = []
+        file_paths = set()
+        self.expand_fields(fields, depth, (), lines, file_paths)
+        return lines, file_paths
+
+    def expand_fields(self, fields, depth, stack, lines, file_paths):
+        u"""Append the lines of the fields to lines
+
+        stack is the types being expanded to detect the cycles. Returns
+        True if a cycle is found.
+        """
+        cyclic = False
+        for field in fields:
+            lines.append(format_field(field))
+            if field.value or not is_message_type(field.type) or \
+                    depth == 0:
+                continue
+            if field.type in stack:
+                lines.append(INDENT + u'# recursive ' + field.type)
+                cyclic = True
+                continue
+            expansion = self.expand_type(field.type, depth, stack)
+            if expansion is None:
+                continue
+            type_lines, type_file_paths, type_cyclic = expansion
+            lines.extend(INDENT + line for line in type_lines)
+            file_paths.update(type_file_paths)
+            cyclic = cyclic or type_cyclic
+        return cyclic
+
+    def expand_type(self, type_name, depth, stack):
+        u"""Get (lines, file paths, cyclic) of the expanded type
+        """
+        key = (type_name, depth)
+        if key in self.expansions:
+            lines, file_paths = self.expansions[key]
+            return lines, file_paths, False
+        found = self.get_type(type_name)
+        if found is None:
+            return None
+        file_path, _, fields = found
+        lines = []
+        file_paths = set([file_path])
+        cyclic = self.expand_fields(fields,
+                                    None if depth is None else depth - 1,
+                                    stack + (type_name,), lines, file_paths)
+        if not cyclic:
+            self.expansions[key] = (lines, file_paths)
+        return lines, file_paths, cyclic
+
+    def get_md5_text(self, fields):
+        u"""Get the text of the fields to compute the MD5 sum of ROS1
+
+        The constants come first, and the message types are replaced by
+        their MD5 sums, as genmsg does. Returns None if one of the types
+        cannot be found.
+        """
+        lines = [u'{0} {1}={2}'.format(field.type, field.name,
+                                       field.value.strip())
+                 for field in fields if field.value]
+        for field in fields:
+            if field.value:
+                continue
+            if is_message_type(field.type):
+                md5sum = self.get_md5sum(field.type)
+                if md5sum is None:
+                    return None
+                lines.append(u'{0} {1}'.format(md5sum, field.name))
+            else:
+                lines.append(u'{0}{1} {2}'.format(field.type, field.size,
+                                                  field.name))
+        return u'\n'.join(lines).strip()
+
+    def get_md5sum(self, type_name):
+        u"""Get the MD5 sum of the message type, or None if not found
+        """
+        if type_name not in self.md5sums:
+            # None until computed, to stop at a cycle
+            self.md5sums[type_name] = None
+            found = self.get_type(type_name)
+            if found is not None:
+                self.md5sums[type_name] = compute_md5sum(
+                    [self.get_md5_text(found[2])])
+        return self.md5sums[type_name]
+
+    def get_all_depends(self, fields):
+        u"""Get the message types which the fields depend on recursively
+
+        The types are ordered as genmsg does. Returns None if one of the
+        types cannot be found.
+        """
+        all_depends = []
+        for depend in unique(field.type for field in fields
+                             if not field.value and
+                             is_message_type(field.type)):
+            if depend not in self.depends:
+                # None until computed, to stop at a cycle
+                self.depends[depend] = None
+                found = self.get_type(depend)
+                if found is not None:
+                    self.depends[depend] = self.get_all_depends(found[2])
+            if self.depends[depend] is None:
+                return None
+            all_depends.append(depend)
+            all_depends.extend(self.depends[depend])
+        return unique(all_depends)
+
+    def get_full_text(self, text, fields):
+        u"""Get the full definition of the message of ROS1
+
+        The text of the message is followed by the ones of all the types
+        it depends on. Returns None if one of the types cannot be found.
+        """
+        all_depends = self.get_all_depends(fields)
+        if all_depends is None:
+            return None
+        texts = [text, u'\n']
+        for depend in all_depends:
+            texts.extend([SEPARATOR, u'MSG: {0}\n'.format(depend),
+                          self.get_type(depend)[1], u'\n'])
+        return u''.join(texts)[:-1]
+
+
+def get_text(file_content):
+    u"""Get the text of the file content, which ends with a newline
+    """
+    return u'\n'.join(file_content.data) + u'\n'
+
+
+def compute_md5sum(md5_texts):
+    u"""Compute the MD5 sum of the concatenated texts
+
+    Returns None if one of the texts is None.
+    """
+    if None in md5_texts:
+        return None
+    return hashlib.md5(u''.join(md5_texts).encode('utf-8')).hexdigest()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+u"""
+    sphinxcontrib.ros.watch
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Command to rebuild the documents on the changes of the ROS files,
+    keeping the package index, the parsed files and the environment in
+    memory.
+
+    Usage::
+
+       $ sphinx-ros-watch doc doc/_build/html --port 8000
+
+    :copyright: Copyright 2015 by Tamaki Nishino.
+    :license: BSD, see LICENSE for details.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import threading
+import time
+try:
+    from http.server import HTTPServer, SimpleHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import HTTPServer
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+
+from sphinx.application import Sphinx
+
+from . import init_inventories
+from .base import ROSObjectDescription, get_base_paths, init_profiler
+from .message import init_type_graph
+from .package import init_depend_graph
+
+
+def get_mtimes(paths):
+    u"""Get the mtimes of the paths, None for the missing ones
+    """
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+
+class ROSWatcher(object):
+    u"""Builder of a project rebuilding it on the changes of the files.
+
+    The Sphinx application is kept between the builds, so that only the
+    documents depending on the changed files are read again, and the
+    package index and the parse cache stay in memory. The files are
+    polled every interval seconds.
+    """
+    def __init__(self, srcdir, outdir, buildername='html', interval=0.5,
+                 status=sys.stdout, warning=sys.stderr):
+        self.srcdir = os.path.abspath(srcdir)
+        self.outdir = os.path.abspath(outdir)
+        self.buildername = buildername
+        self.interval = interval
+        self.status = status
+        self.warning = warning
+        self.app = None
+        self.mtimes = {}
+        self.outdated = set()
+
+    def make_app(self):
+        app = Sphinx(self.srcdir, self.srcdir, self.outdir,
+                     os.path.join(self.outdir, '.doctrees'),
+                     self.buildername, status=self.status,
+                     warning=self.warning)
+        app.connect('env-get-outdated',
+                    lambda app, env, added, changed, removed: self.outdated)
+        return app
+
+    def get_paths(self):
+        u"""Get the paths of the files to watch
+
+        They are the configuration, the documents, their dependencies and
+        the directories of them, the package manifests, the directories
+        crawled to find them and the directories of the interface files.
+        """
+        env = self.app.env
+        paths = set([os.path.join(self.srcdir, 'conf.py')])
+        paths.update(env.doc2path(docname) for docname in env.found_docs)
+        for dependencies in env.dependencies.values():
+            for dependency in dependencies:
+                path = os.path.join(self.srcdir, dependency)
+                paths.add(path)
+                paths.add(os.path.dirname(path))
+        package_index = ROSObjectDescription.package_index
+        paths.update(package_index.manifests)
+        for manifests, dirs in package_index.roots.values():
+            paths.update(dirs)
+        paths.update(os.path.join(package_path, ext)
+                     for package_path, ext in package_index.interfaces)
+        paths.add(self.srcdir)
+        return set(os.path.normpath(path) for path in paths)
+
+    def get_outdated(self, changed):
+        u"""Get the documents depending on the files in the changed
+        directories, to be read again for the added or removed files
+        """
+        dirs = set(path for path in changed if os.path.isdir(path))
+        env = self.app.env
+        return set(docname
+                   for docname, dependencies in env.dependencies.items()
+                   if any(os.path.dirname(os.path.normpath(
+                       os.path.join(self.srcdir, dependency))) in dirs
+                          for dependency in dependencies))
+
+    def refresh(self, changed):
+        u"""Refresh the package index and the caches depending on the files
+        """
+        app = self.app
+        self.outdated = self.get_outdated(changed)
+        package_index = ROSObjectDescription.package_index
+        package_index.base_packages = {}
+        package_index.interfaces = {}
+        package_index.update(get_base_paths(app.env),
+                             app.config.ros_discovery_workers)
+        init_type_graph(app)
+        init_depend_graph(app)
+        init_profiler(app)
+        init_inventories(app)
+
+    def build(self, changed=()):
+        u"""Build the project, from scratch if the configuration changed
+        """
+        start = time.time()
+        if self.app is None or \
+                os.path.join(self.srcdir, 'conf.py') in changed:
+            self.app = self.make_app()
+        else:
+            self.refresh(changed)
+        self.app.build()
+        self.outdated = set()
+        self.mtimes = get_mtimes(self.get_paths())
+        return time.time() - start
+
+    def poll(self):
+        u"""Get the changed paths since the last build
+        """
+        mtimes = get_mtimes(self.mtimes)
+        return sorted(path for path, mtime in mtimes.items()
+                      if mtime != self.mtimes[path])
+
+    def run(self):
+        print('built in {0:.3f} s'.format(self.build()), file=self.status)
+        while True:
+            time.sleep(self.interval)
+            changed = self.poll()
+            if not changed:
+                continue
+            for path in changed:
+                print('changed: ' + os.path.relpath(path, self.srcdir),
+                      file=self.status)
+            try:
+                elapsed = self.build(changed)
+            except Exception as e:
+                # keep watching to build again after the fix
+                print('build failed: {0}'.format(e), file=self.warning)
+                self.mtimes.update(get_mtimes(changed))
+                continue
+            print('rebuilt in {0:.3f} s'.format(elapsed), file=self.status)
+
+
+def serve(outdir, port):
+    u"""Serve the output directory in a thread
+    """
+    class Handler(SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            path = SimpleHTTPRequestHandler.translate_path(self, path)
+            return os.path.join(outdir, os.path.relpath(path, os.getcwd()))
+
+    server = HTTPServer(('localhost', port), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Rebuild the documents on the changes of the files.')
+    parser.add_argument('srcdir')
+    parser.add_argument('outdir')
+    parser.add_argument('-b', '--builder', default='html')
+    parser.add_argument('-i', '--interval', type=float, default=0.5,
+                        help='interval in seconds to poll the files')
+    parser.add_argument('-p', '--port', type=int,
+                        help='port to serve the output directory')
+    args = parser.parse_args(argv)
+    watcher = ROSWatcher(args.srcdir, args.outdir, args.builder,
+                         args.interval)
+    if args.port:
+        serve(watcher.outdir, args.port)
+        print('serving on http://localhost:{0}/'.format(args.port))
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from docutils.writers import html4css1
+from sphinx.writers.html import HTMLTranslator
+from sphinx_testing import TestApp
+
+from sphinxcontrib.ros.cache import ROSParseCache
+from sphinxcontrib.ros.message import ROSAutoType, ROSServiceBase
+
+
+class YieldingDict(OrderedDict):
+    u"""OrderedDict switching the threads on each access
+    """
+    def __contains__(self, key):
+        time.sleep(0.0001)
+        return OrderedDict.__contains__(self, key)
+
+    def pop(self, *args):
+        time.sleep(0.0001)
+        return OrderedDict.pop(self, *args)
+
+    def popitem(self, *args, **kwargs):
+        time.sleep(0.0001)
+        return OrderedDict.popitem(self, *args, **kwargs)
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.type_file = ROSServiceBase.type_file
+        self.file_path, self.file_content = self.type_file.read(
+            os.path.abspath('tests/packages/default_base/package_1'),
+            'Trigger')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def parse(self, parse_cache):
+        with mock.patch.object(self.type_file, 'parse',
+                               wraps=self.type_file.parse) as parse:
+            field_groups = parse_cache.parse(self.type_file, self.file_path,
+                                             self.file_content, 'package_1')
+        return field_groups, parse.call_count
+
+    def make_docfields(self, field_groups):
+        return list(self.type_file.make_docfields(field_groups,
+                                                  ['right1']).xitems())
+
+    def test_memory(self):
+        parse_cache = ROSParseCache(size=1)
+        expected, count = self.parse(parse_cache)
+        self.assertEqual(count, 1)
+        field_groups, count = self.parse(parse_cache)
+        self.assertEqual(count, 0)
+        self.assertIs(field_groups, expected)
+        self.assertEqual((parse_cache.hits, parse_cache.misses), (1, 1))
+
+    def test_disk(self):
+        expected, count = self.parse(ROSParseCache(self.tmpdir))
+        self.assertEqual(count, 1)
+        parse_cache = ROSParseCache(self.tmpdir)
+        field_groups, count = self.parse(parse_cache)
+        self.assertEqual(count, 0)
+        self.assertEqual(parse_cache.disk_hits, 1)
+        self.assertEqual(self.make_docfields(field_groups),
+                         self.make_docfields(expected))
+
+    def test_modified(self):
+        parse_cache = ROSParseCache(self.tmpdir)
+        self.parse(parse_cache)
+        self.file_content.data[-1] += u' modified'
+        field_groups, count = self.parse(parse_cache)
+        self.assertEqual(count, 1)
+        self.assertEqual(parse_cache.misses, 2)
+
+    def test_threads(self):
+        parse_cache = ROSParseCache(size=4)
+        parse_cache.entries = YieldingDict()
+        keys = [str(i % 8) for i in range(2000)]
+
+        def get_or_set(key):
+            if parse_cache.get(key) is None:
+                parse_cache.set(key, [key])
+
+        pool = ThreadPool(8)
+        try:
+            pool.map(get_or_set, keys, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEqual(parse_cache.hits + parse_cache.misses, len(keys))
+        self.assertEqual(len(parse_cache.entries), 4)
+
+
+class TestHighlightCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def build(self):
+        app = TestApp(buildername='html',
+                      srcdir='tests/doc/message_default_conf',
+                      confoverrides={'ros_cache_dir': self.tmpdir},
+                      warning=io.StringIO())
+        app.build()
+        with io.open(os.path.join(app.outdir, 'index.html'),
+                     encoding='utf-8') as f:
+            return f.read(), ROSAutoType.highlight_cache
+
+    def test(self):
+        html, highlight_cache = self.build()
+        self.assertEqual(highlight_cache.hits, 0)
+        self.assertTrue(highlight_cache.misses)
+        # the cached HTML is the one of the running Sphinx
+        cached_html, highlight_cache = self.build()
+        self.assertEqual(highlight_cache.misses, 0)
+        self.assertEqual(cached_html, html)
+
+    def test_not_highlighted(self):
+        # visit_literal_block of docutils visits the children
+        def visit_literal_block(self, node):
+            html4css1.HTMLTranslator.visit_literal_block(self, node)
+
+        with mock.patch.object(HTMLTranslator, 'visit_literal_block',
+                               visit_literal_block):
+            html, highlight_cache = self.build()
+        self.assertEqual(highlight_cache.hits + highlight_cache.disk_hits, 0)
+        self.assertIn(u'<pre class="literal-block">', html)
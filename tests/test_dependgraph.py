@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import collections
+import io
+import unittest
+from docutils import nodes
+from sphinx.ext.graphviz import graphviz
+from sphinx_testing import TestApp
+
+from sphinxcontrib.ros.dependgraph import ROSDependGraph, kinds_option
+
+Package = collections.namedtuple('Package', 'build_depends exec_depends')
+Depend = collections.namedtuple('Depend', 'name')
+
+PACKAGES = {
+    # name -> (build depends, exec depends)
+    'app': (['core', 'msgs'], ['tools']),
+    'msgs': (['core'], []),
+    'core': ([], []),
+    'tools': ([], ['util']),
+    'util': ([], ['tools', 'core']),
+}
+
+
+def find_package(name):
+    find_package.calls.append(name)
+    if name not in PACKAGES:
+        return None
+    build_depends, exec_depends = PACKAGES[name]
+    return Package([Depend(depend) for depend in build_depends],
+                   [Depend(depend) for depend in exec_depends])
+
+
+class TestDependGraph(unittest.TestCase):
+    def setUp(self):
+        find_package.calls = []
+        self.depend_graph = ROSDependGraph(find_package)
+        self.kinds = kinds_option('')
+
+    def test_kinds(self):
+        self.assertEqual(self.kinds, ('build', 'exec'))
+        self.assertEqual(kinds_option('exec build exec'), ('build', 'exec'))
+        self.assertRaises(ValueError, kinds_option, 'test')
+
+    def test_closure(self):
+        self.assertEqual(self.depend_graph.get_closure('app', self.kinds),
+                         frozenset(['core', 'msgs', 'tools', 'util']))
+        self.assertEqual(self.depend_graph.get_closure('app', ('build',)),
+                         frozenset(['core', 'msgs']))
+        # each package is looked up once per kinds
+        self.depend_graph.get_closure('msgs', self.kinds)
+        self.assertEqual(sorted(find_package.calls),
+                         ['app', 'app', 'core', 'core', 'msgs', 'msgs',
+                          'tools', 'util'])
+
+    def test_cycle(self):
+        self.assertEqual(self.depend_graph.get_closure('tools', self.kinds),
+                         frozenset(['core', 'tools', 'util']))
+        self.assertEqual(self.depend_graph.get_closure('util', self.kinds),
+                         frozenset(['core', 'tools', 'util']))
+        self.assertEqual(self.depend_graph.get_depth('tools', self.kinds), 1)
+        self.assertEqual(self.depend_graph.get_depth('util', self.kinds), 1)
+
+    def test_depth(self):
+        self.assertEqual(self.depend_graph.get_depth('core', self.kinds), 0)
+        self.assertEqual(self.depend_graph.get_depth('msgs', self.kinds), 1)
+        self.assertEqual(self.depend_graph.get_depth('app', self.kinds), 2)
+
+    def test_missing(self):
+        self.assertEqual(self.depend_graph.get_closure('none', self.kinds),
+                         frozenset())
+        self.assertEqual(self.depend_graph.get_depth('none', self.kinds), 0)
+
+    def test_dot(self):
+        dot = self.depend_graph.get_dot(['msgs'], self.kinds)
+        self.assertIn(u'  "msgs" [style=bold];\n', dot)
+        self.assertIn(u'  "msgs" -> "core";\n', dot)
+        self.assertNotIn(u'"app"', dot)
+        self.assertIs(dot, self.depend_graph.get_dot(['msgs'], self.kinds))
+
+
+class TestPackageGraph(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = TestApp(buildername='html',
+                          srcdir='tests/doc/depend_graph_conf')
+        cls.app.build()
+        cls.doctree = cls.app.env.get_doctree('index')
+
+    def test_graph(self):
+        codes = [node['code'] for node in self.doctree.traverse(graphviz)]
+        self.assertEqual(len(codes), 2)
+        self.assertIn(u'"nested_msgs" -> "geometry_msgs";', codes[0])
+        self.assertIn(u'"geometry_msgs" -> "std_msgs";', codes[0])
+        # the exec dependencies are not shown
+        self.assertIn(u'"geometry_msgs" [style=bold];', codes[1])
+        self.assertNotIn(u'nested_msgs', codes[1])
+
+    def test_depth(self):
+        text = self.doctree.astext()
+        # catkin is not in the workspace but a dependency
+        self.assertIn(u'Depend Depth\n\n3 (3 packages)', text)
+        self.assertIn(u'Depend Depth\n\n0 (0 packages)', text)
+        # the packages of the workspace sorted by their depths
+        self.assertIn(u'nested_msgs\n\n3\n\n3\n\ngeometry_msgs\n\n2\n\n2\n\n'
+                      u'std_msgs\n\n1\n\n1', text)
+
+
+class TestPackageGraphSource(unittest.TestCase):
+    def test(self):
+        warning = io.StringIO()
+        app = TestApp(buildername='html',
+                      srcdir='tests/doc/depend_graph_conf',
+                      confoverrides={'extensions': 'sphinxcontrib.ros'},
+                      warning=warning)
+        app.build()
+        doctree = app.env.get_doctree('index')
+        self.assertEqual(list(doctree.traverse(graphviz)), [])
+        # the source of the graph is shown instead
+        self.assertIn(u'digraph depends {',
+                      doctree.traverse(nodes.literal_block)[0].astext())
+        self.assertIn(u'add sphinx.ext.graphviz to extensions',
+                      warning.getvalue())
+
+    def test_loaded_by_extension(self):
+        # inheritance_diagram loads graphviz by itself
+        app = TestApp(buildername='html',
+                      srcdir='tests/doc/depend_graph_conf',
+                      confoverrides={'extensions': 'sphinxcontrib.ros,'
+                                     'sphinx.ext.inheritance_diagram'},
+                      warning=io.StringIO())
+        app.build()
+        doctree = app.env.get_doctree('index')
+        self.assertEqual(len(list(doctree.traverse(graphviz))), 2)
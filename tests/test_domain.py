@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import unittest
+
+from sphinxcontrib.ros import ROSDomain
+
+
+class DummyEnv(object):
+    def __init__(self):
+        self.domaindata = {}
+
+
+class TestDomain(unittest.TestCase):
+    def setUp(self):
+        self.domain = ROSDomain(DummyEnv())
+        self.domain.note_object('message', 'pkg/A', 'doc1')
+        self.domain.note_object('message', 'pkg/B', 'doc1')
+        self.domain.note_object('package', 'pkg', 'doc2')
+
+    def test_clear_doc(self):
+        self.domain.clear_doc('doc1')
+        self.assertEqual(self.domain.data['objects'],
+                         {('package', 'pkg'): 'doc2'})
+        self.assertNotIn('doc1', self.domain.data['docnames'])
+
+    def test_note_object_twice(self):
+        self.domain.note_object('message', 'pkg/A', 'doc2')
+        self.domain.clear_doc('doc1')
+        self.assertEqual(self.domain.data['objects'],
+                         {('message', 'pkg/A'): 'doc2',
+                          ('package', 'pkg'): 'doc2'})
+
+    def test_merge_domaindata(self):
+        other = ROSDomain(DummyEnv())
+        other.note_object('message', 'pkg/C', 'doc3')
+        other.note_object('message', 'pkg/D', 'doc4')
+        self.domain.merge_domaindata(['doc3'], other.data)
+        self.assertEqual(self.domain.data['objects'][('message', 'pkg/C')],
+                         'doc3')
+        self.assertNotIn(('message', 'pkg/D'), self.domain.data['objects'])
+        self.assertEqual(self.domain.data['docnames']['doc3'],
+                         set([('message', 'pkg/C')]))
+
+
+class TestFindObjects(unittest.TestCase):
+    def setUp(self):
+        self.domain = ROSDomain(DummyEnv())
+        self.domain.note_object('message', 'geometry_msgs/Pose', 'doc1')
+        self.domain.note_object('message', 'geometry_msgs/Point', 'doc1')
+        self.domain.note_object('message', 'turtlesim/Pose', 'doc2')
+        self.domain.note_object('package', 'geometry_msgs', 'doc1')
+
+    def test_exact(self):
+        self.assertEqual(
+            self.domain.find_objects('geometry_msgs/Pose', ['message']),
+            [('message', 'geometry_msgs/Pose')])
+        self.assertEqual(
+            self.domain.find_objects('geometry_msgs', ['message']), [])
+
+    def test_short_name(self):
+        self.assertEqual(
+            self.domain.find_objects('Point', ['message']),
+            [('message', 'geometry_msgs/Point')])
+        self.assertEqual(
+            self.domain.find_objects('Pose', ['message']),
+            [('message', 'geometry_msgs/Pose'),
+             ('message', 'turtlesim/Pose')])
+
+    def test_case_insensitive(self):
+        self.assertEqual(
+            self.domain.find_objects('point', ['message']),
+            [('message', 'geometry_msgs/Point')])
+        self.assertEqual(
+            self.domain.find_objects('Geometry_Msgs', ['package']),
+            [('package', 'geometry_msgs')])
+
+    def test_cache(self):
+        self.assertEqual(self.domain.find_objects('Twist', ['message']), [])
+        self.assertIn(('Twist', ('message',)), self.domain.resolved)
+        self.domain.note_object('message', 'geometry_msgs/Twist', 'doc3')
+        self.assertEqual(self.domain.find_objects('Twist', ['message']),
+                         [('message', 'geometry_msgs/Twist')])
+
+    def test_builtin_type(self):
+        self.domain.note_object('message', 'std_msgs/String', 'doc3')
+        self.assertEqual(self.domain.find_objects('string', ['message']), [])
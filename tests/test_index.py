@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from sphinxcontrib.ros import index
+from sphinxcontrib.ros.index import ROSPackageIndex
+
+
+class TestPackageIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.base = os.path.join(self.tmpdir, 'base')
+        shutil.copytree('tests/packages/default_base', self.base)
+        self.filename = os.path.join(self.tmpdir, 'doctrees', 'index.pickle')
+        package_index = ROSPackageIndex(self.filename)
+        package_index.update([self.base])
+        package_index.save()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def load(self):
+        package_index = ROSPackageIndex(self.filename)
+        package_index.load()
+        return package_index
+
+    def test_unchanged(self):
+        package_index = self.load()
+        with mock.patch.object(index, 'parse_package') as parse_package, \
+                mock.patch.object(index, 'crawl') as crawl:
+            package_index.update([self.base])
+        self.assertFalse(parse_package.called)
+        self.assertFalse(crawl.called)
+        self.assertEqual(package_index.get('package_1').name, 'package_1')
+        self.assertFalse(package_index.modified)
+
+    def test_modified_manifest(self):
+        package_index = self.load()
+        manifest = os.path.join(self.base, 'package_2', 'package.xml')
+        stat = os.stat(manifest)
+        os.utime(manifest, (stat.st_atime, stat.st_mtime + 10))
+        with mock.patch.object(index, 'parse_package',
+                               wraps=index.parse_package) as parse_package:
+            package_index.update([self.base])
+        parse_package.assert_called_once_with(manifest)
+        self.assertEqual(package_index.get('package_2').name, 'package_2')
+
+    def test_new_package(self):
+        package_index = self.load()
+        shutil.copytree(os.path.join(self.base, 'package_2'),
+                        os.path.join(self.base, 'package_3'))
+        with mock.patch.object(index, 'crawl',
+                               wraps=index.crawl) as crawl:
+            package_index.update([self.base])
+        crawl.assert_called_once_with(self.base, exclude=[])
+
+    def test_base_path_walks(self):
+        package_index = ROSPackageIndex()
+        with mock.patch.object(index, 'crawl',
+                               wraps=index.crawl) as crawl:
+            for i in range(200):
+                package = package_index.get_under(self.base, 'package_1')
+                self.assertEqual(package.name, 'package_1')
+                self.assertIsNone(
+                    package_index.get_under(self.base, 'package_not_exist'))
+        self.assertEqual(crawl.call_count, 1)
+
+    def make_dirs(self, *paths):
+        for path in paths:
+            os.makedirs(os.path.join(self.base, path))
+
+    def touch(self, *paths):
+        for path in paths:
+            open(os.path.join(self.base, path), 'w').close()
+
+    def test_crawl(self):
+        self.make_dirs('build/package_3', 'src/vendor/package_4',
+                       'src/ignored/package_5', 'src/.hidden/package_6',
+                       'src/nested/package_7/sub')
+        self.touch('build/package_3/package.xml',
+                   'src/vendor/package_4/package.xml',
+                   'src/ignored/COLCON_IGNORE',
+                   'src/ignored/package_5/package.xml',
+                   'src/.hidden/package_6/package.xml',
+                   'src/nested/package_7/package.xml')
+        manifests, dirs, _, crawled = index.crawl(self.base)
+        self.assertEqual(
+            [os.path.relpath(path, self.base) for path in manifests],
+            ['build/package_3/package.xml', 'package_1/package.xml',
+             'package_2/package.xml', 'src/nested/package_7/package.xml',
+             'src/vendor/package_4/package.xml'])
+        manifests, dirs, _, crawled = index.crawl(
+            self.base, exclude=['build', 'src/vendor'])
+        self.assertEqual(
+            [os.path.relpath(path, self.base) for path in manifests],
+            ['package_1/package.xml', 'package_2/package.xml',
+             'src/nested/package_7/package.xml'])
+        # base, package_1, package_2, src, ignored, nested, package_7
+        self.assertEqual(crawled[0], 7)
+        self.assertEqual(crawled[0], len(dirs))
+        # build, vendor, .hidden, msg and srv of package_1, package_5, sub
+        self.assertEqual(crawled[1], 7)
+
+    def test_exclude(self):
+        shutil.copytree(os.path.join(self.base, 'package_2'),
+                        os.path.join(self.base, 'sub', 'package_2'))
+        package_index = ROSPackageIndex(self.filename, exclude=['s*'])
+        package_index.load()
+        package_index.update([self.base])
+        self.assertEqual(len(package_index.roots[self.base][0]), 2)
+        package_index.save()
+        parallel = ROSPackageIndex(exclude=['s*'])
+        parallel.update([self.base], workers=4)
+        self.assertEqual(parallel.roots, package_index.roots)
+        # crawled again with the other patterns
+        package_index = self.load()
+        package_index.update([self.base])
+        self.assertEqual(len(package_index.roots[self.base][0]), 3)
+
+    def test_parallel(self):
+        overlay = os.path.join(self.tmpdir, 'overlay')
+        shutil.copytree(os.path.join(self.base, 'package_2'),
+                        os.path.join(overlay, 'src', 'package_2'))
+        serial = ROSPackageIndex()
+        serial.update([overlay, self.base])
+        parallel = ROSPackageIndex()
+        parallel.update([overlay, self.base], workers=4)
+        self.assertEqual(sorted(parallel.packages),
+                         sorted(serial.packages))
+        for package_index in (serial, parallel):
+            # the first base path wins
+            self.assertTrue(package_index.get('package_2').filename.
+                            startswith(overlay))
+            self.assertTrue(package_index.get('package_1').filename.
+                            startswith(self.base))
+        self.assertEqual(parallel.roots, serial.roots)
+
+    def test_interfaces(self):
+        package_index = self.load()
+        package_index.update([self.base])
+        with mock.patch.object(index.os, 'listdir',
+                               wraps=index.os.listdir) as listdir:
+            package_index.index_interfaces()
+            self.assertEqual(listdir.call_count, 6)
+            package_path = os.path.join(self.base, 'package_1')
+            self.assertEqual(package_index.get_interfaces(package_path,
+                                                          'msg'),
+                             ['Message1', 'Message2'])
+            self.assertEqual(package_index.get_interfaces(package_path,
+                                                          'srv'),
+                             ['Trigger'])
+            self.assertEqual(listdir.call_count, 6)
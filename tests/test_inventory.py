@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+from sphinx_testing import TestApp
+
+from sphinxcontrib.ros.inventory import (ROSInventory, write_inventory,
+                                         INVENTORY_FILENAME)
+
+
+class TestInventory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_lookup(self):
+        filename = os.path.join(self.tmpdir, INVENTORY_FILENAME)
+        entries = [(objtype, u'pkg_{0}/Type{1}'.format(i, i % 7),
+                    u'pkg_{0}.html#{1}'.format(i, objtype))
+                   for i in range(1000) for objtype in ('message', 'service')]
+        entries.append(('package', u'pkg', u'pkg.html#package-pkg'))
+        write_inventory(filename, entries)
+        inventory = ROSInventory(filename)
+        try:
+            self.assertEqual(inventory.count, len(entries))
+            for objtype, name, uri in entries:
+                self.assertEqual(inventory.lookup(objtype, name), uri)
+            self.assertEqual(inventory.lookup('message', u'pkg_1/Type0'),
+                             None)
+            self.assertEqual(inventory.lookup('action', u'pkg_1/Type1'),
+                             None)
+            self.assertEqual(inventory.lookup('package', u'pk'), None)
+        finally:
+            inventory.close()
+
+    def test_invalid(self):
+        filename = os.path.join(self.tmpdir, 'objects.inv')
+        with open(filename, 'wb') as f:
+            f.write(b'# Sphinx inventory version 2\n')
+        self.assertRaises(ValueError, ROSInventory, filename)
+
+
+class TestInventoryBuild(unittest.TestCase):
+    def test(self):
+        app = TestApp(buildername='html', srcdir='tests/doc/parallel_conf')
+        app.build()
+        app = TestApp(buildername='html', srcdir='tests/doc/inventory_conf',
+                      confoverrides={'ros_inventories': {
+                          'parallel': ('https://example.com/parallel',
+                                       app.outdir / INVENTORY_FILENAME)}})
+        app.build()
+        with open(app.outdir / 'index.html') as f:
+            html = f.read()
+        for uri in ('package_1.html#package-package_1',
+                    'message1.html#message-package_1/Message1',
+                    'trigger.html#service-package_1/Trigger'):
+            self.assertIn('href="https://example.com/parallel/{0}"'.format(
+                uri), html)
+        self.assertEqual(html.count('href="https://example.com/'), 3)
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 
+import io
+import os
 import unittest
 from sphinx_testing import TestApp
 
@@ -13,7 +15,12 @@ class TestMessage(unittest.TestCase):
         cls.app.build()
 
     def test(self):
-        pass
+        with io.open(os.path.join(self.app.outdir, 'index.html'),
+                     encoding='utf-8') as f:
+            html = f.read()
+        # the field comments of the field-comment option
+        self.assertIn(u'(<em>bool</em>) \u2013 indicate successful run',
+                      html)
 
 
 class TestMessageCustomizedConf(unittest.TestCase):
@@ -25,3 +32,67 @@ class TestMessageCustomizedConf(unittest.TestCase):
 
     def test(self):
         pass
+
+
+class TestInterfaces(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = TestApp(buildername='singlehtml',
+                          srcdir='tests/doc/interfaces_default_conf')
+        cls.app.build()
+
+    def test(self):
+        objects = self.app.env.domaindata['ros']['objects']
+        self.assertEqual(sorted(objects),
+                         [('message', 'package_1/Message1'),
+                          ('message', 'package_1/Message2'),
+                          ('service', 'package_1/Trigger')])
+
+    def test_merge_fields(self):
+        from docutils import nodes
+        doctree = self.app.env.get_doctree('index')
+        labels = [field[0].astext() for field in doctree.traverse(nodes.field)]
+        self.assertIn(u'Constant', labels)
+        self.assertNotIn(u'Constant (Value)', labels)
+        items = [item.astext() for item in doctree.traverse(nodes.list_item)]
+        self.assertTrue(any(item.startswith(
+            u'NEGATIVE_INT32_CONSTANT (int32):-123 ') for item in items))
+
+    def test_raw(self):
+        from sphinxcontrib.ros.message import ROSAutoType, ros_raw_block
+        doctree = self.app.env.get_doctree('index')
+        raw_blocks = list(doctree.traverse(ros_raw_block))
+        self.assertEqual(len(raw_blocks), 3)
+        self.assertTrue(raw_blocks[0].astext().startswith(u'# test comment'))
+        highlight_cache = ROSAutoType.highlight_cache
+        self.assertEqual(highlight_cache.hits + highlight_cache.disk_hits +
+                         highlight_cache.misses, 3)
+
+
+class TestDocfieldNodes(unittest.TestCase):
+    def build(self, docfield_nodes, warning=None):
+        app = TestApp(buildername='singlehtml',
+                      srcdir='tests/doc/docfield_conf',
+                      confoverrides={'ros_docfield_nodes': docfield_nodes},
+                      warning=warning)
+        app.build()
+        with open(os.path.join(app.outdir, 'index.html')) as f:
+            return f.read()
+
+    def test(self):
+        html = self.build(True)
+        self.assertEqual(html, self.build(False))
+        # the field comments and the user field are merged
+        self.assertIn(u'<em>emphasis</em>', html)
+        self.assertIn(u'merged with the user field', html)
+        self.assertIn(u'<li>a bullet</li>', html)
+
+    def test_warning_lines(self):
+        warning = io.StringIO()
+        self.build(True, warning)
+        # the warnings refer to the lines of the comments
+        path = os.path.join('docfield_msgs', 'msg', 'Comments.msg')
+        self.assertIn(path + u':38: WARNING: Inline emphasis start-string',
+                      warning.getvalue())
+        self.assertIn(path + u':28: WARNING: Unknown target name',
+                      warning.getvalue())
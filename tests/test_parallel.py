@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import unittest
+from sphinx_testing import TestApp
+
+
+class TestParallel(unittest.TestCase):
+    def build(self, parallel):
+        app = TestApp(buildername='html', srcdir='tests/doc/parallel_conf',
+                      parallel=parallel)
+        app.build()
+        with open(app.outdir / 'references.html') as f:
+            references = f.read()
+        return app.env.domaindata['ros'], references
+
+    def test(self):
+        data, references = self.build(1)
+        parallel_data, parallel_references = self.build(2)
+        self.assertEqual(parallel_data, data)
+        self.assertEqual(parallel_references, references)
+        self.assertEqual(sorted(data['objects']),
+                         [('message', 'package_1/Message1'),
+                          ('message', 'package_1/Message2'),
+                          ('package', 'package_1'),
+                          ('package', 'package_2'),
+                          ('service', 'package_1/Trigger')])
+        for href in ('package_1.html#package-package_1',
+                     'package_2.html#package-package_2',
+                     'message1.html#message-package_1/Message1',
+                     'message2.html#message-package_1/Message2',
+                     'trigger.html#service-package_1/Trigger'):
+            self.assertIn('href="{0}"'.format(href), references)
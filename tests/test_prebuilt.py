@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+from sphinx_testing import TestApp
+
+from sphinxcontrib.ros import index
+from sphinxcontrib.ros.base import ROSObjectDescription
+from sphinxcontrib.ros.index import ROSPackageIndex
+from sphinxcontrib.ros.message import ROSAutoType
+from sphinxcontrib.ros.prebuilt import build_index, main
+
+BASE_PATH = os.path.abspath('tests/packages/default_base')
+
+
+class TestPrebuiltIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'ros_index.pickle')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_load(self):
+        build_index([BASE_PATH], self.filename)
+        package_index = ROSPackageIndex()
+        with mock.patch.object(index, 'parse_package') as parse_package:
+            package_index.load_prebuilt(self.filename, [BASE_PATH])
+        self.assertFalse(parse_package.called)
+        self.assertEqual(package_index.get('package_1').name, 'package_1')
+        self.assertEqual(package_index.get_interfaces(
+            os.path.join(BASE_PATH, 'package_1'), 'srv'), ['Trigger'])
+        self.assertTrue(package_index.parsed)
+
+    def test_invalid(self):
+        base = os.path.join(self.tmpdir, 'base')
+        shutil.copytree(BASE_PATH, base)
+        build_index([base], self.filename)
+        package_index = ROSPackageIndex()
+        self.assertRaises(ValueError, package_index.load_prebuilt,
+                          self.filename, [BASE_PATH])
+        with open(os.path.join(base, 'package_2', 'package.xml'), 'a') as f:
+            f.write('\n')
+        self.assertRaises(ValueError, package_index.load_prebuilt,
+                          self.filename, [base])
+        self.assertRaises(ValueError, package_index.load_prebuilt,
+                          os.path.join(self.tmpdir, 'missing'), [base])
+
+    def test_same_size(self):
+        base = os.path.join(self.tmpdir, 'base')
+        shutil.copytree(BASE_PATH, base)
+        build_index([base], self.filename)
+        path = os.path.join(base, 'package_1', 'package.xml')
+        with open(path) as f:
+            manifest = f.read()
+        with open(path, 'w') as f:
+            f.write(manifest.replace('<version>0.0.0', '<version>0.0.1'))
+        self.assertRaises(ValueError, ROSPackageIndex().load_prebuilt,
+                          self.filename, [base])
+
+    def test_added(self):
+        base = os.path.join(self.tmpdir, 'base')
+        shutil.copytree(BASE_PATH, base)
+        main([base, '--output', self.filename])
+        shutil.copytree(os.path.join(base, 'package_2'),
+                        os.path.join(base, 'package_3'))
+        with open(os.path.join(base, 'package_3', 'package.xml')) as f:
+            manifest = f.read()
+        with open(os.path.join(base, 'package_3', 'package.xml'), 'w') as f:
+            f.write(manifest.replace('package_2', 'package_3'))
+        with open(os.path.join(base, 'package_1', 'msg', 'Message3.msg'),
+                  'w') as f:
+            f.write('int32 data\n')
+        app = TestApp(buildername='html', srcdir='tests/doc/parallel_conf',
+                      confoverrides={'ros_prebuilt_index': self.filename,
+                                     'ros_base_path': [base]})
+        app.build()
+        package_index = ROSObjectDescription.package_index
+        self.assertEqual(package_index.get('package_3').name, 'package_3')
+        self.assertIn('Message3', package_index.get_interfaces(
+            os.path.join(base, 'package_1'), 'msg'))
+
+    def test_build(self):
+        main([BASE_PATH, '--output', self.filename])
+        with mock.patch.object(index, 'crawl') as crawl:
+            app = TestApp(buildername='html',
+                          srcdir='tests/doc/parallel_conf',
+                          confoverrides={'ros_prebuilt_index': self.filename})
+            app.build()
+        self.assertFalse(crawl.called)
+        self.assertEqual(ROSAutoType.parse_cache.misses, 0)
+        self.assertIn(('service', 'package_1/Trigger'),
+                      app.env.domaindata['ros']['objects'])
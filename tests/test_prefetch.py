@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import io
+import os
+import unittest
+from sphinx_testing import TestApp
+
+from sphinxcontrib.ros.message import ROSTypeFile, ROSAutoType
+
+
+class TestPrefetch(unittest.TestCase):
+    def build(self, prefetch, cache_size=None):
+        app = TestApp(buildername='html', srcdir='tests/doc/nested_conf',
+                      confoverrides={'ros_prefetch': prefetch},
+                      warning=io.StringIO())
+        if cache_size is not None:
+            ROSAutoType.parse_cache.size = cache_size
+        prefetched = []
+        app.connect('source-read', lambda app, docname, source:
+                    prefetched.extend(ROSTypeFile.prefetched))
+        app.build()
+        with open(os.path.join(app.outdir, 'index.html')) as f:
+            html = f.read()
+        return html, sorted(os.path.relpath(path, 'tests/packages')
+                            for path in prefetched)
+
+    def test_documents(self):
+        html, prefetched = self.build('documents')
+        self.assertEqual(html, self.build(None)[0])
+        # the nested types are prefetched as well
+        self.assertEqual(prefetched,
+                         ['nested_base/geometry_msgs/msg/Point.msg',
+                          'nested_base/geometry_msgs/msg/Pose.msg',
+                          'nested_base/geometry_msgs/msg/PoseStamped.msg',
+                          'nested_base/geometry_msgs/msg/Quaternion.msg',
+                          'nested_base/nested_msgs/msg/Point.msg',
+                          'nested_base/nested_msgs/msg/Pose.msg',
+                          'nested_base/nested_msgs/msg/PoseStamped.msg',
+                          'nested_base/nested_msgs/msg/Tree.msg',
+                          'nested_base/std_msgs/msg/Header.msg'])
+        self.assertEqual(ROSTypeFile.prefetched, {})
+
+    def test_all(self):
+        html, prefetched = self.build('all')
+        self.assertEqual(html, self.build(None)[0])
+        self.assertEqual(len(prefetched), 9)
+
+    def test_reserve(self):
+        # the cache is grown before parsing, so that no file is evicted
+        self.build('all', cache_size=2)
+        self.assertEqual(ROSAutoType.parse_cache.disk_hits, 0)
+        self.assertGreaterEqual(ROSAutoType.parse_cache.size, 9)
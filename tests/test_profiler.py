@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from sphinxcontrib.ros.profiler import ROSProfiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_disabled(self):
+        profiler = ROSProfiler()
+        with profiler.measure('run', 'message', 'pkg'):
+            pass
+        self.assertEqual(profiler.stats, {})
+
+    def test_nested(self):
+        profiler = ROSProfiler(True)
+        for i in range(2):
+            with profiler.measure('run', 'message', 'pkg'):
+                with profiler.measure('parse'):
+                    pass
+                with profiler.measure('find_package', package='other'):
+                    pass
+        self.assertEqual(sorted(profiler.stats),
+                         [('find_package', 'message', 'other'),
+                          ('parse', 'message', 'pkg'),
+                          ('run', 'message', 'pkg')])
+        self.assertEqual(profiler.stats['run', 'message', 'pkg'][0], 2)
+        self.assertEqual(profiler.stack, [])
+
+    def test_save(self):
+        profiler = ROSProfiler(True)
+        profiler.merge({('parse', 'message', 'pkg'): [3, 0.5, 100],
+                        ('parse', 'service', 'pkg'): [1, 1.0, 200]})
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'profile.json')
+            profiler.save(filename)
+            with open(filename) as f:
+                report = json.load(f)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(report['entries'][0]['objtype'], 'service')
+        self.assertEqual(report['packages']['pkg']['parse'],
+                         {'calls': 4, 'time': 1.5, 'peak': 200})
+        self.assertEqual(len(profiler.summary(1)), 2)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import glob
+import re
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from docutils.statemachine import StringList
+
+from sphinxcontrib.ros.cache import compress, decompress
+from sphinxcontrib.ros.message import ROSTypeFile
+
+# the per-line regular expression used before the tokenizer
+MATCHER = re.compile(r'([\w/]+)(\s*\[\s*\d*\s*\])?'
+                     r'\s+(\w+)(\s*=\s*[^#]+)?(\s*)(#.*)?$')
+
+LINES = [
+    u'',
+    u'   ',
+    u'#',
+    u'  # indented comment  ',
+    u'---',
+    u'  -----  ',
+    u'--- not a separator',
+    u'int32 a',
+    u'  int32   a   ',
+    u'int32 a# comment',
+    u'int32[] a  # comment  ',
+    u'int32 [ 10 ] a',
+    u'int32 A=1',
+    u'int32 A = 1 # comment',
+    u'float32 A =  -0.5  ',
+    u'string S=foo',
+    u'string S =  foo bar  ',
+    u'string S= "#not a comment"  # nor this  ',
+    u'pkg/Type a',
+    u'Type a',
+    u'Header header',
+    u'int32 a b',
+    u'invalid',
+    u'int32 A=',
+]
+
+
+def legacy_parse(lines):
+    u"""The fields parsed line by line as before the tokenizer
+    """
+    fields = []
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] == '#' or not line.strip('-'):
+            continue
+        result = MATCHER.match(line)
+        if result is None:
+            continue
+        value = result.group(4).lstrip()[1:] if result.group(4) else ''
+        comment = result.group(6) if result.group(6) else ''
+        if result.group(1) == 'string' and value:
+            value += result.group(5) + comment
+            comment = ''
+        else:
+            value = value.strip()
+            comment = comment[1:]
+        fields.append((result.group(3),
+                       (result.group(2) or '').replace(' ', ''),
+                       value, comment))
+    return fields
+
+
+def parse(lines):
+    type_file = ROSTypeFile(ext='msg')
+    field_groups = type_file.parse(StringList(lines, source='test.msg'),
+                                   'pkg')
+    return field_groups, [(field.name, field.size, field.value,
+                           field.comment[0])
+                          for field_group in field_groups
+                          for field in field_group.fields]
+
+
+class TestTokenize(unittest.TestCase):
+    def test_lines(self):
+        for line in LINES:
+            self.assertEqual(parse([line])[1], legacy_parse([line]), line)
+
+    def test_fixtures(self):
+        for path in glob.glob('tests/packages/*/*/*/*.*'):
+            with open(path) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(parse(lines)[1], legacy_parse(lines), path)
+
+    def test_groups(self):
+        field_groups, fields = parse(LINES)
+        self.assertEqual(len(field_groups), 3)
+        self.assertEqual(list(field_groups[0].description.xitems()),
+                         [('test.msg', 0, u''), ('test.msg', 1, u''),
+                          ('test.msg', 2, u''),
+                          ('test.msg', 3, u' indented comment')])
+        field = field_groups[2].fields[0]
+        self.assertEqual((field.source, field.offset), ('test.msg', 7))
+        self.assertEqual(field_groups[2].fields[-2].type, u'pkg/Type')
+        self.assertEqual(field_groups[2].fields[-1].type, u'std_msgs/Header')
+
+    def test_invalid_lines(self):
+        field_groups, fields = parse(LINES)
+        self.assertEqual(field_groups[2].invalid_lines,
+                         (('test.msg', 6, u'--- not a separator'),
+                          ('test.msg', 21, u'int32 a b'),
+                          ('test.msg', 22, u'invalid'),
+                          ('test.msg', 23, u'int32 A=')))
+        reporter = mock.Mock()
+        # the lines survive the parse cache
+        field_groups = decompress(compress(field_groups))
+        ROSTypeFile(ext='msg').report_invalid_lines(field_groups, reporter)
+        self.assertEqual(reporter.warning.call_args_list[2],
+                         mock.call(u'invalid line in msg: invalid',
+                                   source='test.msg', line=23))
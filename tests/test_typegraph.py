@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import os
+import unittest
+from sphinx_testing import TestApp
+
+from sphinxcontrib.ros.message import (ROSMessageBase, ROSServiceBase,
+                                       ros_raw_block)
+from sphinxcontrib.ros.typegraph import ROSTypeGraph, compute_md5sum
+
+BASE_PATH = 'tests/packages/nested_base'
+
+
+def find_type(type_name):
+    find_type.calls.append(type_name)
+    package_name, name = type_name.split('/', 1)
+    if package_name not in find_type.packages:
+        return None
+    type_file = ROSMessageBase.type_file
+    file_path, file_content = type_file.read(
+        os.path.join(BASE_PATH, package_name), name)
+    if file_content is None:
+        return None
+    return (file_path, file_content,
+            type_file.parse(file_content, package_name))
+
+
+class TestTypeGraph(unittest.TestCase):
+    def setUp(self):
+        find_type.calls = []
+        find_type.packages = ['nested_msgs']
+        self.type_graph = ROSTypeGraph(find_type)
+
+    def expand(self, type_name, depth=None):
+        return self.type_graph.expand(
+            self.type_graph.get_type(type_name)[2], depth)
+
+    def test_expand(self):
+        lines, file_paths = self.expand('nested_msgs/PoseStamped')
+        self.assertEqual(lines[:7], [u'std_msgs/Header header',
+                                     u'nested_msgs/Pose pose',
+                                     u'  nested_msgs/Point position',
+                                     u'    float64 x',
+                                     u'    float64 y',
+                                     u'    float64 z',
+                                     u'  float64[4] orientation'])
+        self.assertEqual(lines[-1], u'uint8 MODE=1')
+        self.assertEqual(sorted(os.path.basename(path)
+                                for path in file_paths),
+                         ['Point.msg', 'Pose.msg'])
+        # each type is looked up once
+        self.assertEqual(sorted(find_type.calls),
+                         ['nested_msgs/Point', 'nested_msgs/Pose',
+                          'nested_msgs/PoseStamped', 'std_msgs/Header'])
+
+    def test_depth(self):
+        lines, _ = self.expand('nested_msgs/PoseStamped', 1)
+        self.assertIn(u'  nested_msgs/Point position', lines)
+        self.assertNotIn(u'    float64 x', lines)
+
+    def test_cycle(self):
+        lines, _ = self.expand('nested_msgs/Tree')
+        self.assertEqual(lines, [u'string name',
+                                 u'nested_msgs/Tree[] children',
+                                 u'  string name',
+                                 u'  nested_msgs/Tree[] children',
+                                 u'    # recursive nested_msgs/Tree'])
+        self.assertEqual(self.type_graph.get_md5sum('nested_msgs/Tree'),
+                         None)
+
+
+class TestMD5Sum(unittest.TestCase):
+    def setUp(self):
+        find_type.calls = []
+        find_type.packages = ['std_msgs', 'geometry_msgs']
+        self.type_graph = ROSTypeGraph(find_type)
+
+    def test_md5sum(self):
+        # the MD5 sums computed by genmsg
+        for type_name, md5sum in [
+                ('std_msgs/Header', '2176decaecbce78abc3b96ef049fabed'),
+                ('geometry_msgs/Point', '4a842b65f413084dc2b10fb484ea7f17'),
+                ('geometry_msgs/Quaternion',
+                 'a779879fadf0160734f906b8c19c7004'),
+                ('geometry_msgs/Pose', 'e45d45a5a1ce597b249e23fb30fc871f'),
+                ('geometry_msgs/PoseStamped',
+                 'd3812c3cbc69362b77dc0b19b345f8f5')]:
+            self.assertEqual(self.type_graph.get_md5sum(type_name), md5sum)
+        # each type is looked up once
+        self.assertEqual(len(find_type.calls), 5)
+
+    def test_service(self):
+        type_file = ROSServiceBase.type_file
+        _, file_content = type_file.read(
+            'tests/packages/default_base/package_1', 'Trigger')
+        field_groups = type_file.parse(file_content, 'package_1')
+        self.assertEqual(
+            compute_md5sum([self.type_graph.get_md5_text(field_group.fields)
+                            for field_group in field_groups]),
+            '937c9679a518e3a18d831e57125ea522')
+
+    def test_full_text(self):
+        _, text, fields = self.type_graph.get_type('geometry_msgs/PoseStamped')
+        full_text = self.type_graph.get_full_text(text, fields)
+        separator = u'=' * 80 + u'\n'
+        self.assertEqual(
+            [part.split(u'\n', 1)[0] for part in full_text.split(separator)],
+            [u'# A Pose with reference coordinate frame and timestamp',
+             u'MSG: std_msgs/Header', u'MSG: geometry_msgs/Pose',
+             u'MSG: geometry_msgs/Point', u'MSG: geometry_msgs/Quaternion'])
+        self.assertTrue(full_text.endswith(u'float64 w\n'))
+
+
+class TestExpand(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = TestApp(buildername='html', srcdir='tests/doc/nested_conf')
+        cls.app.build()
+
+    def test(self):
+        doctree = self.app.env.get_doctree('index')
+        blocks = [block.astext() for block in doctree.traverse(ros_raw_block)
+                  if block.get('language') != 'none']
+        self.assertEqual(len(blocks), 6)
+        self.assertIn(u'    float64 x', blocks[0])
+        self.assertEqual(blocks[1],
+                         u'nested_msgs/Point position\nfloat64[4] orientation')
+
+    def test_md5sum(self):
+        domain = self.app.env.get_domain('ros')
+        self.assertEqual(
+            domain.get_md5sums('message', 'geometry_msgs/PoseStamped'),
+            {'md5sum': 'd3812c3cbc69362b77dc0b19b345f8f5'})
+        # not noted without the index
+        self.assertEqual(domain.get_md5sums('service', 'package_1/Trigger'),
+                         {})
+        # not computed if the types cannot be found
+        self.assertEqual(domain.get_md5sums('message', 'nested_msgs/Tree'),
+                         {})
+        doctree = self.app.env.get_doctree('index')
+        text = doctree.astext()
+        self.assertIn(u'd3812c3cbc69362b77dc0b19b345f8f5', text)
+        self.assertIn(u'937c9679a518e3a18d831e57125ea522', text)
+
+    def test_definition(self):
+        doctree = self.app.env.get_doctree('index')
+        blocks = [block for block in doctree.traverse(ros_raw_block)
+                  if block.get('language') == 'none']
+        self.assertEqual(len(blocks), 1)
+        self.assertIn(u'MSG: geometry_msgs/Quaternion', blocks[0].astext())
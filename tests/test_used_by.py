@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from sphinx.application import Sphinx
+from sphinx_testing import TestApp
+
+
+class TestUsedBy(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = TestApp(buildername='html',
+                          srcdir='tests/doc/used_by_conf')
+        cls.app.build()
+        cls.used_by = cls.app.env.get_domain('ros').get_used_by()
+
+    def test_interfaces(self):
+        self.assertEqual(self.used_by[('message', 'geometry_msgs/Pose')],
+                         [('message', 'geometry_msgs/PoseStamped'),
+                          ('node', 'geometry_msgs/pose_publisher')])
+        self.assertEqual(self.used_by[('message', 'std_msgs/Header')],
+                         [('message', 'geometry_msgs/PoseStamped')])
+        self.assertNotIn(('message', 'geometry_msgs/PoseStamped'),
+                         self.used_by)
+
+    def test_packages(self):
+        self.assertEqual(self.used_by[('package', 'std_msgs')],
+                         [('package', 'geometry_msgs')])
+        self.assertNotIn(('package', 'geometry_msgs'), self.used_by)
+
+    def read(self, docname):
+        with io.open(os.path.join(self.app.outdir, docname + '.html'),
+                     encoding='utf-8') as f:
+            return f.read()
+
+    def test_html(self):
+        self.assertIn(u'Reverse Depends:', self.read('index'))
+        html = self.read('interfaces')
+        self.assertIn(u'Used By:', html)
+        self.assertIn(u'href="node.html#node-geometry_msgs/pose_publisher"',
+                      html)
+
+
+class TestUsedByUpdate(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.srcdir = os.path.join(self.tmpdir, 'doc')
+        shutil.copytree('tests/doc/used_by_conf', self.srcdir)
+        with open(os.path.join(self.srcdir, 'conf.py'), 'w') as f:
+            f.write("master_doc = 'index'\n"
+                    "extensions = ['sphinxcontrib.ros']\n"
+                    "ros_base_path = [{0!r}]\n".format(
+                        os.path.abspath('tests/packages/nested_base')))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def build(self):
+        app = Sphinx(self.srcdir, self.srcdir,
+                     os.path.join(self.tmpdir, 'html'),
+                     os.path.join(self.tmpdir, 'doctrees'), 'html',
+                     status=None, warning=io.StringIO())
+        app.build()
+        with io.open(os.path.join(app.outdir, 'interfaces.html'),
+                     encoding='utf-8') as f:
+            return f.read()
+
+    def test_remove_user(self):
+        self.assertIn(u'node-geometry_msgs/pose_publisher', self.build())
+        # only node.rst changes, interfaces.rst is written again for the users
+        with open(os.path.join(self.srcdir, 'node.rst'), 'w') as f:
+            f.write('test-node\n=========\n')
+        self.assertNotIn(u'node-geometry_msgs/pose_publisher', self.build())
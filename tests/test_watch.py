@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from sphinxcontrib.ros.watch import ROSWatcher
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.srcdir = os.path.join(self.tmpdir, 'doc')
+        self.base = os.path.join(self.tmpdir, 'base')
+        shutil.copytree('tests/doc/parallel_conf', self.srcdir)
+        shutil.copytree('tests/packages/default_base', self.base)
+        with open(os.path.join(self.srcdir, 'conf.py'), 'w') as f:
+            f.write("master_doc = 'index'\n"
+                    "extensions = ['sphinxcontrib.ros']\n"
+                    "ros_base_path = ['../base']\n")
+        self.watcher = ROSWatcher(self.srcdir,
+                                  os.path.join(self.tmpdir, 'html'),
+                                  status=None, warning=io.StringIO())
+        self.watcher.build()
+        self.read = []
+        self.watcher.app.connect(
+            'source-read',
+            lambda app, docname, source: self.read.append(docname))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def append(self, path, text):
+        path = os.path.join(self.base, path)
+        with open(path, 'a') as f:
+            f.write(text)
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        return path
+
+    def test_unchanged(self):
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_interface(self):
+        path = self.append('package_1/msg/Message1.msg', 'int32 new_field\n')
+        changed = self.watcher.poll()
+        self.assertEqual(changed, [path])
+        app = self.watcher.app
+        self.watcher.build(changed)
+        self.assertIs(self.watcher.app, app)
+        self.assertEqual(self.read, ['message1'])
+        with io.open(os.path.join(self.tmpdir, 'html', 'message1.html'),
+                     encoding='utf-8') as f:
+            self.assertIn(u'new_field', f.read())
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_manifest(self):
+        self.append('package_2/package.xml', '\n')
+        self.watcher.build(self.watcher.poll())
+        self.assertEqual(self.read, ['package_2'])
+
+    def test_added(self):
+        shutil.copy(os.path.join(self.base, 'package_1/msg/Message2.msg'),
+                    os.path.join(self.base, 'package_1/msg/Message3.msg'))
+        path = os.path.join(self.base, 'package_1/msg')
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        self.watcher.build(self.watcher.poll())
+        self.assertEqual(sorted(self.read), ['message1', 'message2'])